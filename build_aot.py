@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Ahead-of-time build of the Numba backtest kernels
+Compiles sma_backtest_numba.simulate into the sma_backtest_aot extension
+module and rebound_backtest_numba.simulate into rebound_backtest_aot, so
+backtests skip the JIT compile on their first call. Run once after
+installing the requirements (npm run build-aot); the engines fall back to
+the JIT kernels when the extensions are not built.
+"""
+
+import os
+import sys
+
+from numba.pycc import CC
+
+import rebound_backtest_numba
+import sma_backtest_numba
+
+# Extension module name -> module whose simulate kernel it exports
+KERNELS = {
+    'sma_backtest_aot': sma_backtest_numba,
+    'rebound_backtest_aot': rebound_backtest_numba,
+}
+
+
+def main():
+    """Build the extensions next to this file"""
+    output_dir = os.path.dirname(os.path.abspath(__file__))
+    for name, module in KERNELS.items():
+        cc = CC(name)
+        cc.output_dir = output_dir
+        cc.export('simulate', module.SIMULATE_SIGNATURE)(module.simulate.py_func)
+
+        print(f"Compiling {name} into {cc.output_dir}...")
+        cc.compile()
+    print("Done")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
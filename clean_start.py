@@ -7,10 +7,12 @@ Deletes existing files and runs the analysis with clean files
 """
 
 import os
-import subprocess
 import sys
 import time
 from data_handler import download_spy_data
+from runners.run_sma import get_sma_csv_fields
+from strategies.sma_crossover_strategy import SmaCrossStrategy
+from strategy_runner import run_strategy_backtest
 
 def main():
     print("Starting clean run of SMA Crossover Strategy...")
@@ -29,36 +31,40 @@ def main():
             except Exception as e:
                 print(f"Error deleting file {file_path}: {e}")
     
-    # Download fresh data
+    # Download fresh data, bypassing the download cache
     print("Downloading fresh data...")
     start_date = "2000-01-01"
     end_date = "2023-12-31"
-    if not download_spy_data(start_date, end_date, data_file):
+    if not download_spy_data(start_date, end_date, data_file, force=True):
         print("Error: Failed to download data")
-        return
+        return 1
     
-    # Build the command
-    cmd = [
-        sys.executable,  # Use the current Python interpreter
-        "run_backtest.py",
-        "--data", data_file,
-        "--output", results_file
-    ]
-    
-    # Run the command
+    # Run the backtest in this process
     print("Running analysis with clean files...")
     start_time = time.time()
-    result = subprocess.run(cmd)
+    try:
+        success = run_strategy_backtest(
+            strategy_class=SmaCrossStrategy,
+            data_file=data_file,
+            output_file=results_file,
+            csv_fields=get_sma_csv_fields()
+        )
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        success = False
     end_time = time.time()
     
     # Check if the analysis was successful
-    if result.returncode == 0 and os.path.exists(results_file):
+    if success and os.path.exists(results_file):
         print(f"Analysis completed successfully in {end_time - start_time:.2f} seconds!")
         print(f"Results saved to {results_file}")
+        exit_code = 0
     else:
         print("Analysis failed. Check the error messages above.")
+        exit_code = 1
     
     print("Clean start completed!")
+    return exit_code
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
@@ -6,40 +6,234 @@ Data Handler for SMA Crossover Strategy
 Handles downloading and processing of financial data
 """
 
+import csv
+import json
+import os
+import re
+import time
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
+import pyarrow.parquet as pq
+
+# Cached data younger than this is used without contacting Yahoo Finance
+CACHE_MAX_AGE = 24 * 60 * 60  # seconds
+
+# Columns every price file must provide
+REQUIRED_COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+# Start of a data row (YYYY-MM-DD date in the first column)
+DATE_ROW = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+
+def cache_path(filename):
+    """Return the Parquet cache file that sits next to a data file"""
+    return os.path.splitext(filename)[0] + '.parquet'
+
+
+def read_columns(filename):
+    """Return the column names of a CSV or Parquet file without reading its data"""
+    if filename.endswith('.parquet'):
+        return pq.read_schema(filename).names
+    with open(filename, newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def _strip_extra_header_rows(csv_file):
+    """
+    Drop the rows between the header and the first dated row of a CSV file
+    
+    yfinance's multi-level CSVs put 'Ticker,SPY,...' and 'Date,,,...' rows
+    under a 'Price,...' header. The file is streamed through a temporary copy,
+    with the first column renamed to Date. Returns True if it was rewritten.
+    """
+    with open(csv_file, newline='') as fin:
+        reader = csv.reader(fin)
+        header = next(reader, [])
+        
+        # Only the leading rows are read when nothing needs fixing
+        skipped = 0
+        row = next(reader, None)
+        while row is not None and not (row and DATE_ROW.match(row[0])):
+            skipped += 1
+            row = next(reader, None)
+        if not skipped or not header:
+            return False
+        
+        tmp_file = csv_file + '.tmp'
+        with open(tmp_file, 'w', newline='') as fout:
+            writer = csv.writer(fout, lineterminator='\n')
+            writer.writerow(['Date'] + header[1:])
+            if row is not None:
+                writer.writerow(row)
+            writer.writerows(reader)
+    
+    os.replace(tmp_file, csv_file)
+    print(f"Removed {skipped} extra header rows")
+    return True
+
+
+def _validation_key(filename):
+    """Return the (mtime, size) key recorded in a file's .ok sidecar"""
+    return f"{os.path.getmtime(filename)}:{os.path.getsize(filename)}"
+
+
+def _read_meta(filename):
+    """Return the contents of a data file's .meta.json sidecar, or None"""
+    try:
+        with open(filename + '.meta.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _fetch_spy_data(start_date, end_date):
+    """
+    Fetch SPY data from Yahoo Finance as a DataFrame with a Date column
+    """
+    # Imported here so cache hits never pay for importing yfinance
+    import yfinance as yf
+    
+    # Explicit options keep the layout stable across yfinance versions
+    spy_data = yf.download('SPY', start=start_date, end=end_date, auto_adjust=False,
+                           progress=False, threads=False, group_by='column')
+    
+    if spy_data.empty:
+        return spy_data
+        
+    print("Data downloaded successfully. Structure:")
+    print(spy_data.head(2))
+    
+    # Newer yfinance versions still add a ticker level for a single ticker
+    if isinstance(spy_data.columns, pd.MultiIndex):
+        spy_data = spy_data.xs('SPY', axis=1, level=1)
+    
+    # Reset the index to make Date a column
+    spy_data = spy_data.reset_index()
+    
+    # Add OpenInterest column (required by Backtrader)
+    spy_data.insert(len(spy_data.columns), 'OpenInterest', 0)
+    
+    return spy_data
+
+
+def _record_download(cache_file, last_date, end):
+    """
+    Record in the cache's .meta.json sidecar the date its downloads reach
+    
+    Only bars that were actually returned count, and bars on or after the
+    download day may still change, so the recorded date is the earliest of
+    the day after last_date, end and today.
+    """
+    fetched_to = min(last_date + pd.Timedelta(days=1), end, pd.Timestamp.now().normalize())
+    try:
+        with open(cache_file + '.meta.json', 'w') as f:
+            json.dump({'fetched_to': str(fetched_to.date())}, f)
+    except OSError:
+        pass
+
 
-def download_spy_data(start_date, end_date, filename='spy_data.csv'):
+def _missing_weekdays(fetched_to, end):
+    """Count the weekdays from fetched_to up to end (or today, if earlier)"""
+    horizon = min(end, pd.Timestamp.now().normalize())
+    return int(np.busday_count(fetched_to.date(), horizon.date()))
+
+
+def download_spy_data(start_date, end_date, filename='spy_data.csv', force=False):
     """
     Download SPY data from Yahoo Finance and save to CSV
+    
+    Downloads are cached in a Parquet file next to filename, with a sidecar
+    recording the date the downloads reach. A cache with no weekday missing
+    before end_date is used as is; a shorter one only has the missing tail
+    fetched, unless it was downloaded up to the present less than
+    CACHE_MAX_AGE ago. force
+    ignores the cache and downloads the whole range. A <filename>.meta.json
+    sidecar records which cache and date range filename was written from, so
+    it is left untouched (keeping its validation and Parquet copies current)
+    when neither changed.
     """
     try:
-        # Download SPY data
-        print(f"Downloading SPY data from {start_date} to {end_date}...")
-        spy_data = yf.download('SPY', start=start_date, end=end_date)
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        cache_file = cache_path(filename)
         
-        if spy_data.empty:
-            print("Error: No data downloaded from Yahoo Finance")
-            return None
-            
-        print("Data downloaded successfully. Structure:")
-        print(spy_data.head(2))
+        spy_data = None
+        if os.path.exists(cache_file) and not force:
+            cached = pd.read_parquet(cache_file)
+            # Allow for market holidays right after the requested start
+            if not cached.empty and cached['Date'].iloc[0] - start <= pd.Timedelta(days=7):
+                spy_data = cached
         
-        # Handle multi-index columns if present
-        if isinstance(spy_data.columns, pd.MultiIndex):
-            print("Detected multi-index columns. Flattening structure...")
-            spy_data.columns = spy_data.columns.get_level_values(0)
+        if spy_data is None:
+            reason = "Forced download" if force else "Cache miss"
+            print(f"{reason}: downloading SPY data from {start_date} to {end_date}...")
+            spy_data = _fetch_spy_data(start_date, end_date)
+            if spy_data.empty:
+                print("Error: No data downloaded from Yahoo Finance")
+                return None
+            spy_data.to_parquet(cache_file, compression='snappy', index=False)
+            _record_download(cache_file, spy_data['Date'].iloc[-1], end)
+        else:
+            # Caches from before the sidecar reach the day after their last bar
+            meta = _read_meta(cache_file) or {}
+            fetched_to = pd.Timestamp(meta.get('fetched_to',
+                                               spy_data['Date'].iloc[-1] + pd.Timedelta(days=1)))
+            
+            # A cache downloaded up to the present has every bar there was,
+            # so it is only refreshed once it is older than CACHE_MAX_AGE
+            downloaded = pd.Timestamp.fromtimestamp(os.path.getmtime(cache_file + '.meta.json')
+                                                    if meta else os.path.getmtime(cache_file))
+            age = time.time() - downloaded.timestamp()
+            # Weekends between the last bar and end have nothing to fetch
+            if _missing_weekdays(fetched_to, end) <= 0 or (fetched_to >= downloaded.normalize()
+                                                            and age <= CACHE_MAX_AGE):
+                print(f"Cache hit: using SPY data from {cache_file}")
+            else:
+                # Only fetch the bars the cache does not reach
+                tail_start = fetched_to.strftime('%Y-%m-%d')
+                print(f"Cache short: downloading SPY data from {tail_start} to {end_date}...")
+                tail = _fetch_spy_data(tail_start, end_date)
+                # An empty tail (e.g. a failed or throttled download) leaves
+                # the sidecar alone, so the next call fetches it again
+                if not tail.empty:
+                    spy_data = pd.concat([spy_data, tail], ignore_index=True)
+                    spy_data = spy_data.drop_duplicates(subset='Date', keep='last')
+                    spy_data.to_parquet(cache_file, compression='snappy', index=False)
+                    _record_download(cache_file, tail['Date'].iloc[-1], end)
         
-        # Reset the index to make Date a column
-        spy_data = spy_data.reset_index()
+        # Leave the data file alone if it was written from this same cache
+        source = {
+            'cache_mtime': os.path.getmtime(cache_file),
+            'start': str(start.date()),
+            'end': str(end.date())
+        }
+        meta = _read_meta(filename)
+        if (filename != cache_file and os.path.exists(filename) and meta is not None
+                and meta.get('source') == source
+                and meta.get('file') == _validation_key(filename)):
+            print(f"Data file {filename} is up to date")
+            return filename
         
-        # Add OpenInterest column (required by Backtrader)
-        spy_data['OpenInterest'] = 0
+        # Keep only the requested date range
+        spy_data = spy_data[(spy_data['Date'] >= start) & (spy_data['Date'] < end)]
         
-        # Save to CSV with proper format
-        spy_data.to_csv(filename, index=False)
+        # Save with proper format
+        if filename.endswith('.parquet'):
+            if filename != cache_file:
+                spy_data.to_parquet(filename, index=False)
+        else:
+            spy_data.to_csv(filename, index=False)
         print(f"Data saved to {filename}")
         
+        # Record what the data file was written from
+        if filename != cache_file:
+            try:
+                with open(filename + '.meta.json', 'w') as f:
+                    json.dump({'source': source, 'file': _validation_key(filename)}, f)
+            except OSError:
+                pass
+        
         return filename
         
     except Exception as e:
@@ -49,36 +243,139 @@ def download_spy_data(start_date, end_date, filename='spy_data.csv'):
 def check_and_fix_csv(csv_file):
     """
     Check if the CSV file has the correct format and fix it if needed
-    """
-    import os
     
+    Parquet files (.parquet) are checked the same way. A passing check is
+    recorded in a <file>.ok sidecar keyed on the file's mtime and size, so
+    unchanged files are not checked again.
+    """
     if not os.path.exists(csv_file):
         print(f"Error: CSV file {csv_file} does not exist")
         return False
     
+    # Skip the check if the file is unchanged since it last passed
+    ok_file = csv_file + '.ok'
+    try:
+        with open(ok_file) as f:
+            if f.read() == _validation_key(csv_file):
+                return True
+    except OSError:
+        pass
+    
     try:
-        # Try to read the file with pandas
-        df = pd.read_csv(csv_file)
+        # Read only the header (or the Parquet schema), not the data
+        is_parquet = csv_file.endswith('.parquet')
+        if not is_parquet:
+            _strip_extra_header_rows(csv_file)
+        columns = read_columns(csv_file)
         
-        print(f"CSV file structure:")
-        print(df.head(2))
+        print(f"CSV file columns: {columns}")
         
         # Check for required columns
-        required_cols = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-        missing_cols = [col for col in required_cols if col not in df.columns]
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
         
         if missing_cols:
             print(f"Error: Missing required columns: {missing_cols}")
             return False
+        
+        # Check the date format on the first data row with the regex instead
+        # of parsing the whole column
+        if not is_parquet:
+            with open(csv_file, newline='') as f:
+                reader = csv.reader(f)
+                date_index = next(reader).index('Date')
+                row = next(reader, None)
+            if row is None or DATE_ROW.match(row[date_index]) is None:
+                print("Error: Date column is not in YYYY-MM-DD format")
+                return False
             
-        # Add OpenInterest if missing
-        if 'OpenInterest' not in df.columns:
-            df['OpenInterest'] = 0
-            df.to_csv(csv_file, index=False)
+        # Add OpenInterest if missing (the only case that needs the data)
+        if 'OpenInterest' not in columns:
+            if is_parquet:
+                df = pd.read_parquet(csv_file)
+                df['OpenInterest'] = 0
+                df.to_parquet(csv_file, index=False)
+            else:
+                df = pd.read_csv(csv_file, engine='pyarrow')
+                df['OpenInterest'] = 0
+                df.to_csv(csv_file, index=False)
             print("Added OpenInterest column")
         
+        # Remember that this version of the file is valid
+        try:
+            with open(ok_file, 'w') as f:
+                f.write(_validation_key(csv_file))
+        except OSError:
+            pass
+        
         return True
         
     except Exception as e:
         print(f"Error checking CSV file: {e}")
-        return False 
\ No newline at end of file
+        return False 
+
+
+def read_price_columns(data_file, columns):
+    """
+    Read the given columns of a CSV or Parquet price file
+    
+    A parsed CSV is mirrored to <file>.parquet (e.g. spy_data.csv.parquet)
+    and read from there while the mirror is newer than the CSV, so the text
+    is only parsed again after the CSV changes.
+    """
+    if data_file.endswith('.parquet'):
+        return pd.read_parquet(data_file, columns=columns)
+    
+    # Use the binary mirror if the CSV has not changed since it was written
+    mirror = data_file + '.parquet'
+    try:
+        if os.path.getmtime(mirror) >= os.path.getmtime(data_file):
+            return pd.read_parquet(mirror, columns=columns)
+    except Exception:
+        pass
+    
+    # Mirror every column so any later selection can be served from it.
+    # Arrow's multi-threaded parser rounds prices exactly like Backtrader's float()
+    df = pd.read_csv(data_file, engine='pyarrow')
+    try:
+        df.to_parquet(mirror, compression='zstd', index=False)
+    except Exception as e:
+        print(f"Warning: Could not write Parquet copy {mirror}: {e}")
+    return df[columns]
+
+
+def load_price_frame(data_file):
+    """
+    Load a CSV or Parquet price file into a DataFrame indexed by date
+    
+    Columns are lower-cased so the frame can be passed straight to
+    bt.feeds.PandasData, which matches them by name. Returns None if the
+    file is missing or malformed.
+    """
+    if not os.path.exists(data_file):
+        print(f"Error: Data file {data_file} does not exist")
+        return None
+    
+    try:
+        # Check for required columns from the header alone
+        columns = read_columns(data_file)
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in columns]
+        if missing_cols:
+            print(f"Error: Missing required columns: {missing_cols}")
+            return None
+        
+        # Read only the price columns (e.g. skip Adj Close)
+        usecols = [col for col in columns if col in REQUIRED_COLUMNS or col == 'OpenInterest']
+        df = read_price_columns(data_file, usecols)
+        
+        df = df.set_index(pd.to_datetime(df['Date'])).drop(columns='Date')
+        df.columns = [col.lower() for col in df.columns]
+        
+        # Add openinterest if missing (required by Backtrader)
+        if 'openinterest' not in df.columns:
+            df['openinterest'] = 0
+        
+        return df
+        
+    except Exception as e:
+        print(f"Error loading data file {data_file}: {e}")
+        return None
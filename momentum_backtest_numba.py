@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Numba Market Momentum Backtest
+Runs the Market Momentum strategy as a single compiled loop over NumPy arrays
+instead of Backtrader's per-bar Python callbacks. The indicators come from
+utils.indicators, and the entries, exits, trailing stop and broker
+accounting follow MarketMomentumStrategy and Backtrader's broker (market
+orders filled at the next bar's open). Writes the same columns as the
+CSVWriter analyzer used by runners/run_momentum.py, and sweeps parameter
+grids across all cores in one compiled call.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from data_handler import check_and_fix_csv, read_price_columns
+from utils._njit import njit, prange
+from utils.indicators import macd, rsi, sma
+from utils.metrics import compute_metrics, print_summary, trade_stats
+from utils.results import save_results_frame
+
+# MACD periods used by MarketMomentumStrategy
+MACD_PERIODS = (12, 26, 9)
+
+# Period of the strategy's ATR, which only delays the first bar it trades
+ATR_PERIOD = 14
+
+# MarketMomentumStrategy's parameter defaults, used for parameters not swept
+DEFAULT_PARAMS = {
+    'fast_ma': 10,
+    'medium_ma': 30,
+    'rsi_period': 14,
+    'rsi_oversold': 40,
+    'rsi_overbought': 70,
+    'trail_percent': 0.07,
+    'risk_per_trade': 0.5,
+}
+
+
+@njit(cache=True)
+def first_trading_bar(fast_ma, medium_ma, rsi_period):
+    """Return the first bar Backtrader calls next() on, once every indicator has a value"""
+    me1, me2, signal = MACD_PERIODS
+    return max(fast_ma, medium_ma, rsi_period + 1, max(me1, me2) + signal - 1,
+               ATR_PERIOD + 1) - 1
+
+
+@njit(cache=True, error_model='numpy')
+def simulate(open_, close, fast_ma, medium_ma, rsi_arr, macd_line, macd_signal,
+             first_bar, rsi_oversold, rsi_overbought, trail_percent,
+             risk_per_trade, cash0, comm):
+    """
+    Simulate the Market Momentum strategy bar by bar
+
+    The strategy trades from first_bar, the first bar every indicator has a
+    value for. Returns arrays (position, cash, portfolio_value), each holding
+    the value seen at the close of every bar.
+    """
+    n = close.shape[0]
+    position_arr = np.zeros(n, dtype=np.int64)
+    cash_arr = np.empty(n, dtype=np.float64)
+    portfolio_value = np.empty(n, dtype=np.float64)
+
+    cash = cash0
+    position = 0
+    position_price = 0.0
+    trailing_stop = 0.0
+
+    # Order created on the previous bar: size > 0 buys, size < 0 closes
+    pending_size = 0
+    pending_price = 0.0
+
+    for i in range(n):
+        # Execute the pending order at this bar's open
+        if pending_size > 0:
+            # The broker checks the cash at the creation price and again at
+            # the fill price, rejecting the order if either would overdraw
+            created_cash = cash - pending_size * pending_price
+            created_cash -= pending_size * comm * pending_price
+            fill_cash = cash - pending_size * open_[i]
+            fill_cash -= pending_size * comm * open_[i]
+            if created_cash >= 0.0 and fill_cash >= 0.0:
+                cash = fill_cash
+                if position == 0:
+                    position_price = open_[i]
+                else:
+                    position_price = ((position_price * position + pending_size * open_[i])
+                                      / (position + pending_size))
+                position += pending_size
+                if trailing_stop == 0.0:
+                    trailing_stop = open_[i]
+        elif pending_size < 0:
+            # Closing returns the cost basis plus the profit and loss, summed
+            # separately as the broker does (not rounded as position * open)
+            cash += position * position_price + position * (open_[i] - position_price)
+            cash -= position * comm * open_[i]
+            position = 0
+            position_price = 0.0
+            trailing_stop = 0.0
+        pending_size = 0
+
+        price = close[i]
+        position_arr[i] = position
+        cash_arr[i] = cash
+        if position > 0:
+            # The broker's value adds the unrealized profit back on top,
+            # which rounds differently from position * price
+            unrealized = position * (price - position_price)
+            portfolio_value[i] = cash + ((position * price - unrealized) + unrealized)
+        else:
+            portfolio_value[i] = cash
+
+        if i < first_bar:
+            continue
+
+        # Move the trailing stop up with the price, and close if it is hit
+        if position != 0 and trailing_stop != 0.0:
+            if price > trailing_stop * (1.0 + trail_percent):
+                trailing_stop = price
+            if price < trailing_stop * (1.0 - trail_percent):
+                pending_size = -1
+                pending_price = price
+                continue
+
+        if position == 0 or position < 3 * int(cash / price * risk_per_trade):
+            # Entry signals
+            uptrend = fast_ma[i] > medium_ma[i] and fast_ma[i - 1] <= medium_ma[i - 1]
+            rsi_signal = rsi_arr[i] > rsi_oversold and rsi_arr[i - 1] <= rsi_oversold
+            macd_cross = macd_line[i] > macd_signal[i] and macd_line[i - 1] <= macd_signal[i - 1]
+            pullback = (fast_ma[i] > medium_ma[i] and price < fast_ma[i]
+                        and price > close[i - 1])
+            if uptrend or rsi_signal or macd_cross or pullback:
+                size = int(cash * risk_per_trade / price)
+                if size > 0:
+                    pending_size = size
+                    pending_price = price
+        elif position != 0:
+            # Exit signals (in addition to the trailing stop)
+            rsi_exit = rsi_arr[i] > rsi_overbought
+            downtrend = fast_ma[i] < medium_ma[i] and fast_ma[i - 1] >= medium_ma[i - 1]
+            macd_exit = macd_line[i] < macd_signal[i] and macd_line[i - 1] >= macd_signal[i - 1]
+            if rsi_exit or downtrend or macd_exit:
+                pending_size = -1
+                pending_price = price
+
+    return position_arr, cash_arr, portfolio_value
+
+
+@njit(cache=True, parallel=True)
+def sweep(open_, close, fast_ma, medium_ma, rsi_period, rsi_oversold, rsi_overbought,
+          trail_percent, risk_per_trade, cash0, comm):
+    """
+    Simulate every parameter combination k (element k of each parameter
+    array) across all cores
+
+    Returns the portfolio value and position arrays of combination k in
+    row k of two matrices.
+    """
+    # The MACD periods are fixed, so its lines are shared by every run
+    me1, me2, signal = MACD_PERIODS
+    macd_line, macd_signal = macd(close, me1, me2, signal)
+
+    n_runs = fast_ma.shape[0]
+    portfolio_values = np.empty((n_runs, close.shape[0]), dtype=np.float64)
+    positions = np.empty((n_runs, close.shape[0]), dtype=np.int64)
+    for k in prange(n_runs):
+        position, _, portfolio_value = simulate(
+            open_, close, sma(close, fast_ma[k]), sma(close, medium_ma[k]),
+            rsi(close, rsi_period[k]), macd_line, macd_signal,
+            first_trading_bar(fast_ma[k], medium_ma[k], rsi_period[k]),
+            rsi_oversold[k], rsi_overbought[k], trail_percent[k],
+            risk_per_trade[k], cash0, comm)
+        portfolio_values[k, :] = portfolio_value
+        positions[k, :] = position
+    return portfolio_values, positions
+
+
+def run_backtest(data_file, output_file='strategy_results.csv', fast_ma=10,
+                 medium_ma=30, rsi_period=14, rsi_oversold=40, rsi_overbought=70,
+                 trail_percent=0.07, risk_per_trade=0.5, start_cash=10000.0,
+                 commission=0.001):
+    """
+    Run the compiled Market Momentum backtest and save results to CSV (or
+    Parquet/Feather, by the extension of output_file)
+
+    Parameters:
+    - data_file: Path to the data file
+    - output_file: Path to save results (None to skip saving them)
+    - fast_ma: Fast moving average period
+    - medium_ma: Medium moving average period
+    - rsi_period: RSI period
+    - rsi_oversold: RSI oversold threshold
+    - rsi_overbought: RSI overbought threshold
+    - trail_percent: Trailing stop percentage
+    - risk_per_trade: Fraction of the cash used per entry
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    """
+    # Check (and repair) the data file, as the Backtrader engine does
+    if not check_and_fix_csv(data_file):
+        return False
+
+    try:
+        # Load only the columns the kernel needs
+        print(f"Loading data from {data_file}...")
+        df = read_price_columns(data_file, ['Date', 'Open', 'Close'])
+        open_ = np.require(df['Open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        close = np.require(df['Close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+
+        # Compute every indicator once over the whole series
+        fast = sma(close, int(fast_ma))
+        medium = sma(close, int(medium_ma))
+        rsi_arr = rsi(close, int(rsi_period))
+        macd_line, macd_signal = macd(close, *MACD_PERIODS)
+
+        # Backtrader starts calling next() once every indicator has a value
+        first_bar = first_trading_bar(int(fast_ma), int(medium_ma), int(rsi_period))
+
+        print(f'Starting Portfolio Value: {start_cash:.2f}')
+        print("Running backtest...")
+        position, cash, portfolio_value = simulate(
+            open_, close, fast, medium, rsi_arr, macd_line, macd_signal,
+            first_bar, float(rsi_oversold), float(rsi_overbought),
+            float(trail_percent), float(risk_per_trade),
+            float(start_cash), float(commission))
+
+        print(f'Final Portfolio Value: {portfolio_value[-1]:.2f}')
+
+        # Summarize the run in the same format as the Backtrader engine
+        metrics = {'final_value': float(portfolio_value[-1]), **compute_metrics(portfolio_value),
+                   **trade_stats(position, open_, commission)}
+        print_summary(metrics)
+
+        # Save the same columns as the CSVWriter analyzer
+        if output_file:
+            results_df = pd.DataFrame({
+                'Date': df['Date'],
+                'Close': close,
+                'Position': position,
+                'Cash': cash,
+                'PortfolioValue': portfolio_value
+            })
+            save_results_frame(results_df, output_file)
+            print(f"Backtest results saved to {output_file}")
+        return metrics
+
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        return False
+
+
+def run_sweep(data_file, param_grid, sweep_output='sweep_results.csv',
+              start_cash=10000.0, commission=0.001, base_params=None):
+    """
+    Run the compiled Market Momentum backtest over every combination of a
+    parameter grid in one parallel kernel call and save the summary metrics
+    to a single CSV
+
+    Parameters:
+    - data_file: Path to the data file
+    - param_grid: Dict of parameter name (a key of DEFAULT_PARAMS) -> list of values
+    - sweep_output: Path to save the sweep summary
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    - base_params: Parameter values used when not swept (DEFAULT_PARAMS otherwise)
+    """
+    # Check (and repair) the data file, as the Backtrader engine does
+    if not check_and_fix_csv(data_file):
+        return False
+
+    base_params = {**DEFAULT_PARAMS, **(base_params or {})}
+    unknown = [name for name in {**param_grid, **base_params} if name not in DEFAULT_PARAMS]
+    if unknown:
+        print(f"Error: Unknown parameters for the numba sweep: {unknown}")
+        return False
+
+    try:
+        # Load the prices once for the whole grid
+        print(f"Loading data from {data_file}...")
+        df = read_price_columns(data_file, ['Date', 'Open', 'Close'])
+        open_ = np.require(df['Open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        close = np.require(df['Close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+
+        # One array per parameter, holding its value in every combination
+        names = list(param_grid)
+        combinations = [dict(zip(names, values))
+                        for values in itertools.product(*param_grid.values())]
+        params = {name: [{**base_params, **combination}[name] for combination in combinations]
+                  for name in DEFAULT_PARAMS}
+        int_params = [np.array(params[name], dtype=np.int64)
+                      for name in ('fast_ma', 'medium_ma', 'rsi_period')]
+        float_params = [np.array(params[name], dtype=np.float64)
+                        for name in ('rsi_oversold', 'rsi_overbought',
+                                     'trail_percent', 'risk_per_trade')]
+
+        print(f"Sweeping {len(combinations)} parameter combinations in one compiled call...")
+        portfolio_values, positions = sweep(open_, close, *int_params, *float_params,
+                                            float(start_cash), float(commission))
+
+        # Summarize each run with the same metrics as the Backtrader sweep
+        rows = []
+        for k, combination in enumerate(combinations):
+            rows.append({**combination, 'final_value': portfolio_values[k, -1],
+                         **compute_metrics(portfolio_values[k]),
+                         **trade_stats(positions[k], open_, commission)})
+
+        pd.DataFrame(rows).to_csv(sweep_output, index=False)
+        print(f"Sweep results saved to {sweep_output}")
+        return True
+
+    except Exception as e:
+        print(f"Error running sweep: {e}")
+        return False
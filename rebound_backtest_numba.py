@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Numba Rebound Backtest
+Runs the Rebound strategy as a single compiled loop over NumPy arrays instead
+of Backtrader's per-bar Python callbacks. The lookback drops are computed for
+every bar at once with array operations; the loop only tracks the position,
+the purchase price and Backtrader's broker accounting (market orders filled
+at the next bar's open). Writes the same columns as the CSVWriter analyzer
+used by runners/run_rebound.py, and sweeps parameter grids across all cores
+in one compiled call.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from data_handler import check_and_fix_csv, read_price_columns
+from utils._njit import njit, prange
+from utils.metrics import compute_metrics, print_summary, trade_stats
+from utils.results import save_results_frame
+from utils.signals import drop_signals
+
+# ReboundStrategy's parameter defaults, used for parameters not swept
+DEFAULT_PARAMS = {
+    'drop_threshold': 0.10,
+    'rise_threshold': 0.20,
+    'lookback_period': 5,
+}
+
+# (open, close, buy_signal, rise_threshold, start_cash, commission) ->
+# (position, cash, portfolio_value, purchase_price), all C-contiguous
+SIMULATE_SIGNATURE = (
+    'Tuple((i8[::1], f8[::1], f8[::1], f8[::1]))'
+    '(f8[::1], f8[::1], b1[::1], f8, f8, f8)'
+)
+
+
+# The explicit signature compiles the kernel at import time, with the same
+# types as the ahead-of-time build
+@njit(SIMULATE_SIGNATURE, cache=True, error_model='numpy')
+def simulate(open_, close, buy_signal, rise_threshold, cash0, comm):
+    """
+    Simulate the Rebound strategy bar by bar
+
+    Returns arrays (position, cash, portfolio_value, purchase_price), each
+    holding the value seen at the close of every bar; the purchase price is
+    NaN while out of the market.
+    """
+    n = close.shape[0]
+    position_arr = np.zeros(n, dtype=np.int64)
+    cash_arr = np.empty(n, dtype=np.float64)
+    portfolio_value = np.empty(n, dtype=np.float64)
+    purchase_price_arr = np.full(n, np.nan)
+
+    cash = cash0
+    position = 0
+    position_price = 0.0
+    purchase_price = 0.0
+
+    # Order created on the previous bar: size > 0 buys, size < 0 closes
+    pending_size = 0
+    pending_price = 0.0
+
+    for i in range(n):
+        # Execute the pending order at this bar's open
+        if pending_size > 0:
+            # The broker checks the cash at the creation price and again at
+            # the fill price, rejecting the order if either would overdraw
+            created_cash = cash - pending_size * pending_price
+            created_cash -= pending_size * comm * pending_price
+            fill_cash = cash - pending_size * open_[i]
+            fill_cash -= pending_size * comm * open_[i]
+            if created_cash >= 0.0 and fill_cash >= 0.0:
+                cash = fill_cash
+                position = pending_size
+                position_price = open_[i]
+                # The strategy records the order's executed price, which
+                # Backtrader averages as value / size
+                purchase_price = (pending_size * open_[i]) / pending_size
+        elif pending_size < 0:
+            # Closing returns the cost basis plus the profit and loss, summed
+            # separately as the broker does (not rounded as position * open)
+            cash += position * position_price + position * (open_[i] - position_price)
+            cash -= position * comm * open_[i]
+            position = 0
+            position_price = 0.0
+            purchase_price = 0.0
+        pending_size = 0
+
+        price = close[i]
+        position_arr[i] = position
+        cash_arr[i] = cash
+        if position > 0:
+            # The broker's value adds the unrealized profit back on top,
+            # which rounds differently from position * price
+            unrealized = position * (price - position_price)
+            portfolio_value[i] = cash + ((position * price - unrealized) + unrealized)
+            purchase_price_arr[i] = purchase_price
+        else:
+            portfolio_value[i] = cash
+
+        if position == 0:
+            # Buy with all the cash after a large enough drop
+            if buy_signal[i]:
+                size = int(cash / price)
+                if size > 0:
+                    pending_size = size
+                    pending_price = price
+        elif (price - purchase_price) / purchase_price >= rise_threshold:
+            # Sell everything once the price has risen far enough
+            pending_size = -1
+            pending_price = price
+
+    return position_arr, cash_arr, portfolio_value, purchase_price_arr
+
+
+@njit(cache=True, parallel=True)
+def sweep(open_, close, buy_signals, rise_threshold, cash0, comm):
+    """
+    Simulate every combination k (row k of buy_signals, element k of
+    rise_threshold) across all cores
+
+    Returns the portfolio value and position arrays of combination k in
+    row k of two matrices.
+    """
+    n_runs = rise_threshold.shape[0]
+    portfolio_values = np.empty((n_runs, close.shape[0]), dtype=np.float64)
+    positions = np.empty((n_runs, close.shape[0]), dtype=np.int64)
+    for k in prange(n_runs):
+        position, _, portfolio_value, _ = simulate(open_, close, buy_signals[k],
+                                                   rise_threshold[k], cash0, comm)
+        portfolio_values[k, :] = portfolio_value
+        positions[k, :] = position
+    return portfolio_values, positions
+
+
+# Prefer the ahead-of-time build (python build_aot.py) to skip the JIT compile
+try:
+    from rebound_backtest_aot import simulate as compiled_simulate
+except ImportError:
+    compiled_simulate = simulate
+
+
+def run_backtest(data_file, output_file='rebound_results.csv', drop_threshold=0.10,
+                 rise_threshold=0.20, lookback_period=5, start_cash=10000.0,
+                 commission=0.001):
+    """
+    Run the compiled Rebound backtest and save results to CSV (or
+    Parquet/Feather, by the extension of output_file)
+
+    Parameters:
+    - data_file: Path to the data file
+    - output_file: Path to save results (None to skip saving them)
+    - drop_threshold: Drop over the lookback period that triggers a buy
+    - rise_threshold: Rise from the purchase price that triggers a sell
+    - lookback_period: Lookback period in trading days
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    """
+    # Check (and repair) the data file, as the Backtrader engine does
+    if not check_and_fix_csv(data_file):
+        return False
+
+    try:
+        # Load only the columns the kernel needs
+        print(f"Loading data from {data_file}...")
+        df = read_price_columns(data_file, ['Date', 'Open', 'Close'])
+        open_ = np.require(df['Open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        close = np.require(df['Close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+
+        # Find every buy signal up front with array operations
+        buy_signal = drop_signals(close, float(drop_threshold), int(lookback_period))
+
+        print(f'Starting Portfolio Value: {start_cash:.2f}')
+        print("Running backtest...")
+        position, cash, portfolio_value, purchase_price = compiled_simulate(
+            open_, close, buy_signal, float(rise_threshold),
+            float(start_cash), float(commission))
+
+        print(f'Final Portfolio Value: {portfolio_value[-1]:.2f}')
+
+        # Summarize the run in the same format as the Backtrader engine
+        metrics = {'final_value': float(portfolio_value[-1]), **compute_metrics(portfolio_value),
+                   **trade_stats(position, open_, commission)}
+        print_summary(metrics)
+
+        # Save the same columns as the CSVWriter analyzer
+        if output_file:
+            results_df = pd.DataFrame({
+                'Date': df['Date'],
+                'Close': close,
+                'Position': position,
+                'Cash': cash,
+                'PortfolioValue': portfolio_value,
+                'PurchasePrice': purchase_price,
+                'PriceChangePct': (close - purchase_price) / purchase_price * 100
+            })
+            save_results_frame(results_df, output_file)
+            print(f"Backtest results saved to {output_file}")
+        return metrics
+
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        return False
+
+
+def run_sweep(data_file, param_grid, sweep_output='sweep_results.csv',
+              start_cash=10000.0, commission=0.001, base_params=None):
+    """
+    Run the compiled Rebound backtest over every combination of a parameter
+    grid in one parallel kernel call and save the summary metrics to a
+    single CSV
+
+    Parameters:
+    - data_file: Path to the data file
+    - param_grid: Dict of parameter name (a key of DEFAULT_PARAMS) -> list of values
+    - sweep_output: Path to save the sweep summary
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    - base_params: Parameter values used when not swept (DEFAULT_PARAMS otherwise)
+    """
+    # Check (and repair) the data file, as the Backtrader engine does
+    if not check_and_fix_csv(data_file):
+        return False
+
+    base_params = {**DEFAULT_PARAMS, **(base_params or {})}
+    unknown = [name for name in {**param_grid, **base_params} if name not in DEFAULT_PARAMS]
+    if unknown:
+        print(f"Error: Unknown parameters for the numba sweep: {unknown}")
+        return False
+
+    try:
+        # Load the prices once for the whole grid
+        print(f"Loading data from {data_file}...")
+        df = read_price_columns(data_file, ['Date', 'Open', 'Close'])
+        open_ = np.require(df['Open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        close = np.require(df['Close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+
+        # The buy signals of each combination, one row per combination
+        names = list(param_grid)
+        combinations = [dict(zip(names, values))
+                        for values in itertools.product(*param_grid.values())]
+        params = [{**base_params, **combination} for combination in combinations]
+        buy_signals = np.array([drop_signals(close, float(p['drop_threshold']),
+                                             int(p['lookback_period']))
+                                for p in params])
+        rise_threshold = np.array([p['rise_threshold'] for p in params], dtype=np.float64)
+
+        print(f"Sweeping {len(combinations)} parameter combinations in one compiled call...")
+        portfolio_values, positions = sweep(open_, close, buy_signals, rise_threshold,
+                                            float(start_cash), float(commission))
+
+        # Summarize each run with the same metrics as the Backtrader sweep
+        rows = []
+        for k, combination in enumerate(combinations):
+            rows.append({**combination, 'final_value': portfolio_values[k, -1],
+                         **compute_metrics(portfolio_values[k]),
+                         **trade_stats(positions[k], open_, commission)})
+
+        pd.DataFrame(rows).to_csv(sweep_output, index=False)
+        print(f"Sweep results saved to {sweep_output}")
+        return True
+
+    except Exception as e:
+        print(f"Error running sweep: {e}")
+        return False
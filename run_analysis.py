@@ -9,9 +9,18 @@ Run the entire SMA Crossover Strategy workflow:
 """
 
 import os
+import sys
 import argparse
-import subprocess
 import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from data_handler import check_and_fix_csv, download_spy_data
+
+DEFAULT_START_DATE = '2000-01-01'
+DEFAULT_END_DATE = '2023-12-31'
 
 def delete_file_if_exists(file_path):
     """Delete a file if it exists"""
@@ -25,6 +34,102 @@ def delete_file_if_exists(file_path):
             return False
     return True
 
+def parse_range(value):
+    """
+    Parse a parameter range given as 'start:stop:step' (stop inclusive)
+    or as a comma-separated list of values
+    """
+    if ':' in value:
+        parts = [int(p) for p in value.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        return list(range(start, stop + 1, step))
+    return [int(p) for p in value.split(',')]
+
+# Price data, strategy and runner set up once per sweep worker by _init_worker
+_sweep_df = None
+_strategy_class = None
+_run_backtest = None
+
+def _init_worker(data_file):
+    """
+    Warm up a sweep worker process when it starts
+    
+    Imports Backtrader and the strategy modules and loads the price data once,
+    so every backtest the worker runs afterwards starts straight away.
+    """
+    global _sweep_df, _strategy_class, _run_backtest
+    from data_handler import load_price_frame
+    from strategies.sma_crossover_strategy import SmaCrossStrategy
+    from strategy_runner import run_strategy_backtest_with_df
+    
+    _strategy_class = SmaCrossStrategy
+    _run_backtest = run_strategy_backtest_with_df
+    _sweep_df = load_price_frame(data_file)
+
+def _run_one(fast, slow, args):
+    """Run a single SMA Crossover backtest in-process for a sweep"""
+    if _sweep_df is None:
+        print(f"Error: Could not load data file {args.data}")
+        return None
+    
+    # Only the summary metrics are kept, so no per-pair results file is written
+    metrics = _run_backtest(
+        strategy_class=_strategy_class,
+        df=_sweep_df,
+        output_file=None,
+        start_cash=args.cash,
+        commission=args.commission,
+        plot=False,
+        strategy_params={'fast_period': fast, 'slow_period': slow}
+    )
+    return metrics or None
+
+def sweep_pairs(args):
+    """Return every (fast, slow) pair with slow > fast from the sweep ranges in args"""
+    fast_range = parse_range(args.fast_range) if args.fast_range else [args.fast]
+    slow_range = parse_range(args.slow_range) if args.slow_range else [args.slow]
+    return [(fast, slow) for fast in fast_range for slow in slow_range if slow > fast]
+
+def run_sweep(args):
+    """
+    Run the SMA Crossover backtest over every (fast, slow) pair in parallel
+    and save the summary metrics of all runs to a single CSV
+    """
+    pairs = sweep_pairs(args)
+    if not pairs:
+        print("Error: No (fast, slow) pairs with slow > fast to sweep")
+        return False
+    
+    # Check (and repair) the data file once, before any worker reads it
+    if not check_and_fix_csv(args.data):
+        return False
+    
+    # Backtests are independent, so spread them over all cores
+    mp_context = multiprocessing.get_context('spawn') if sys.platform in ('darwin', 'win32') else None
+    print(f"Sweeping {len(pairs)} parameter pairs with {args.workers} workers...")
+    rows = []
+    # Each worker parses the data file once and reuses it for all its pairs
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp_context,
+                             initializer=_init_worker, initargs=(args.data,)) as ex:
+        futures = {ex.submit(_run_one, fast, slow, args): (fast, slow) for fast, slow in pairs}
+        for future in as_completed(futures):
+            fast, slow = futures[future]
+            metrics = future.result()
+            if metrics is None:
+                print(f"Backtest failed for fast={fast}, slow={slow}")
+                continue
+            rows.append({'fast': fast, 'slow': slow, **metrics})
+    
+    if not rows:
+        print("Error: All sweep backtests failed")
+        return False
+    
+    sweep_df = pd.DataFrame(rows).sort_values(['fast', 'slow'])
+    sweep_df.to_csv(args.sweep_output, index=False)
+    print(f"Sweep results saved to {args.sweep_output}")
+    return True
+
 def main():
     parser = argparse.ArgumentParser(description='Run SMA Crossover Strategy Analysis')
     parser.add_argument('--cash', type=float, default=10000.0,
@@ -43,53 +148,87 @@ def main():
                         help='Path to save the results CSV file')
     parser.add_argument('--force-download', action='store_true',
                         help='Force re-download of data even if file exists')
+    parser.add_argument('--sweep', action='store_true',
+                        help='Backtest every (fast, slow) pair from --fast-range and --slow-range in parallel')
+    parser.add_argument('--fast-range', type=str, default=None,
+                        help="Fast SMA periods to sweep, as 'start:stop:step' or a comma-separated list")
+    parser.add_argument('--slow-range', type=str, default=None,
+                        help="Slow SMA periods to sweep, as 'start:stop:step' or a comma-separated list")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes for the sweep')
+    parser.add_argument('--sweep-output', type=str, default='sweep_results.csv',
+                        help='Path to save the sweep summary CSV file')
     args = parser.parse_args()
     
     print("=" * 50)
     print("SMA Crossover Strategy Analysis")
     print("=" * 50)
     
-    # Step 1: Run backtest
-    print("\nRunning backtest...")
-    backtest_cmd = [
-        "python", "run_backtest.py",
-        "--cash", str(args.cash),
-        "--commission", str(args.commission),
-        "--fast", str(args.fast),
-        "--slow", str(args.slow),
-        "--data", args.data,
-        "--output", args.output
-    ]
-    
-    if args.no_plot:
-        backtest_cmd.append("--no-plot")
-        
+    # Step 1: Make sure the data is available
     if args.force_download:
-        backtest_cmd.append("--force-download")
         # Delete the existing data file if force-download is specified
         delete_file_if_exists(args.data)
     
-    backtest_result = subprocess.run(backtest_cmd)
+    if not os.path.exists(args.data):
+        print("\nDownloading data...")
+        if not download_spy_data(DEFAULT_START_DATE, DEFAULT_END_DATE, args.data,
+                                 force=args.force_download):
+            print("Error: Failed to download data")
+            print("=" * 50)
+            return 1
     
-    # Only proceed with visualization if backtest was successful
-    if backtest_result.returncode == 0 and os.path.exists(args.output):
-        # Step 2: Visualize results
-        print("\nVisualizing results...")
-        visualize_cmd = [
-            "python", "visualize_results.py",
-            "--results", args.output
-        ]
-        
-        subprocess.run(visualize_cmd)
+    # Sweep the parameter grid instead of a single backtest
+    if args.sweep:
+        success = run_sweep(args)
+        print("=" * 50)
+        return 0 if success else 1
+    
+    # Step 2: Run backtest
+    print("\nRunning backtest...")
+    try:
+        # Backtrader and matplotlib are only imported once there is work to do
+        from runners.run_sma import get_sma_csv_fields
+        from strategies.sma_crossover_strategy import SmaCrossStrategy
+        from strategy_runner import run_strategy_backtest
         
-        print("\nAnalysis complete!")
-        print(f"Results saved to {args.output}")
-        print(f"Visualization saved to strategy_performance.png")
-    else:
+        success = run_strategy_backtest(
+            strategy_class=SmaCrossStrategy,
+            data_file=args.data,
+            output_file=args.output,
+            start_cash=args.cash,
+            commission=args.commission,
+            plot=not args.no_plot,
+            strategy_params={'fast_period': args.fast, 'slow_period': args.slow},
+            csv_fields=get_sma_csv_fields()
+        )
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        success = False
+    
+    # Only proceed with visualization if backtest was successful
+    if not success or not os.path.exists(args.output):
         print("\nBacktest failed or no results file was generated.")
         print("Please check the error messages above.")
+        print("=" * 50)
+        return 1
     
+    # Step 3: Visualize results
+    print("\nVisualizing results...")
+    try:
+        import visualize_results
+        
+        visualize_results.main(args.output, plot=not args.no_plot)
+    except Exception as e:
+        print(f"Error visualizing results: {e}")
+        print("=" * 50)
+        return 1
+    
+    print("\nAnalysis complete!")
+    print(f"Results saved to {args.output}")
+    if not args.no_plot:
+        print(f"Visualization saved to strategy_performance.png")
     print("=" * 50)
+    return 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Run any strategy backtest from a single entry point
+Each strategy is a subcommand taking the common runner options plus its own,
+e.g. python run_backtest.py rebound --drop 0.05 --no-plot
+"""
+
+import sys
+import argparse
+
+from strategy_runner import parse_common_args
+from runners import run_buy_and_hold, run_momentum, run_rebound, run_sma
+
+# Subcommand name -> (runner module, help text)
+STRATEGIES = {
+    'buy_and_hold': (run_buy_and_hold, 'Buy and Hold Strategy'),
+    'sma': (run_sma, 'SMA Crossover Strategy'),
+    'momentum': (run_momentum, 'Market Momentum Strategy'),
+    'rebound': (run_rebound, 'Rebound Strategy'),
+}
+
+
+def build_parser():
+    """Build the parser with one subcommand per strategy"""
+    parser = argparse.ArgumentParser(description='Run Strategy Backtest')
+    subparsers = parser.add_subparsers(dest='strategy', required=True)
+    common = parse_common_args(add_help=False)
+    for name, (runner, help_text) in STRATEGIES.items():
+        subparser = subparsers.add_parser(name, parents=[common], help=help_text)
+        runner.add_arguments(subparser)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    runner, help_text = STRATEGIES[args.strategy]
+    return runner.main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,20 +9,22 @@ import sys
 from data_handler import download_spy_data
 from strategies.buy_and_hold_strategy import BuyAndHoldStrategy
 from strategy_runner import run_strategy_backtest, parse_common_args
+from utils.results import output_path
 
 
-if __name__ == '__main__':
-    # Parse command line arguments
-    parser = parse_common_args()
-    args = parser.parse_args()
-    
+def add_arguments(parser):
+    """Buy and Hold has no arguments beyond those of parse_common_args"""
+
+
+def main(args):
+    """Run the Buy and Hold backtest for parsed command line arguments and return the exit code"""
     # Download data if requested
     if args.download:
         print(f"Downloading fresh data from {args.start_date} to {args.end_date}...")
         data_file = download_spy_data(args.start_date, args.end_date, args.data)
         if not data_file:
             print("Error: Failed to download data")
-            sys.exit(1)
+            return 1
     else:
         data_file = args.data
     
@@ -30,7 +32,7 @@ if __name__ == '__main__':
     success = run_strategy_backtest(
         strategy_class=BuyAndHoldStrategy,
         data_file=data_file,
-        output_file=args.output,
+        output_file=output_path(args.output, args.format),
         start_cash=args.cash,
         commission=args.commission,
         plot=not args.no_plot
@@ -38,7 +40,13 @@ if __name__ == '__main__':
     
     if success:
         print("Backtest completed successfully")
-        sys.exit(0)
+        return 0
     else:
         print("Backtest failed")
-        sys.exit(1) 
\ No newline at end of file
+        return 1
+
+
+if __name__ == '__main__':
+    parser = parse_common_args()
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
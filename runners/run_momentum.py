@@ -5,17 +5,16 @@
 Run the Market Momentum Strategy backtest using the shared strategy runner
 """
 
+import os
 import sys
 from data_handler import download_spy_data
 from strategies.market_momentum_strategy import MarketMomentumStrategy
-from strategy_runner import run_strategy_backtest, parse_common_args
+from strategy_runner import run_strategy_backtest, run_grid_sweep, load_param_grid, parse_common_args
+from utils.results import output_path
 
 
-if __name__ == '__main__':
-    # Parse command line arguments
-    parser = parse_common_args()
-    
-    # Add strategy-specific arguments
+def add_arguments(parser):
+    """Add the Market Momentum strategy arguments to a parser from parse_common_args"""
     parser.add_argument('--fast-ma', type=int, default=10, help='Fast moving average period')
     parser.add_argument('--medium-ma', type=int, default=20, help='Medium moving average period')
     parser.add_argument('--rsi-period', type=int, default=14, help='RSI period')
@@ -23,20 +22,39 @@ if __name__ == '__main__':
     parser.add_argument('--rsi-overbought', type=int, default=70, help='RSI overbought threshold')
     parser.add_argument('--trail-percent', type=float, default=0.05, help='Trailing stop percentage')
     parser.add_argument('--risk-per-trade', type=float, default=0.02, help='Risk per trade as fraction of portfolio')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--engine', type=str, default='backtrader', choices=['backtrader', 'numba'],
+                        help='Backtest engine (numba skips Backtrader and does not plot)')
+    parser.add_argument('--use-talib', action='store_true',
+                        help="Compute the indicators with TA-Lib's C functions (requires the TA-Lib package)")
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not print the trade log (e.g. for parameter sweeps)')
+    parser.add_argument('--sweep-config', type=str, default=None,
+                        help='JSON file mapping strategy parameters to lists of values to sweep (spread over --workers processes)')
+    parser.add_argument('--sweep-output', type=str, default='sweep_results.csv',
+                        help='Path to save the sweep summary CSV file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes for the sweep')
+
+
+def numba_params(strategy_params):
+    """Return the strategy parameters the numba engine takes (it has no TA-Lib path or trade log)"""
+    return {name: value for name, value in strategy_params.items()
+            if name not in ('use_talib', 'quiet')}
+
+
+def main(args):
+    """Run the Market Momentum backtest for parsed command line arguments and return the exit code"""
     # Download data if requested
     if args.download:
         print(f"Downloading fresh data from {args.start_date} to {args.end_date}...")
         data_file = download_spy_data(args.start_date, args.end_date, args.data)
         if not data_file:
             print("Error: Failed to download data")
-            sys.exit(1)
+            return 1
     else:
         data_file = args.data
     
-    # Set up strategy parameters
+    # Set up strategy parameters (shared by every run of a sweep)
     strategy_params = {
         'fast_ma': args.fast_ma,
         'medium_ma': args.medium_ma,
@@ -44,23 +62,61 @@ if __name__ == '__main__':
         'rsi_oversold': args.rsi_oversold,
         'rsi_overbought': args.rsi_overbought,
         'trail_percent': args.trail_percent,
-        'risk_per_trade': args.risk_per_trade
+        'risk_per_trade': args.risk_per_trade,
+        'use_talib': args.use_talib,
+        'quiet': args.quiet
     }
     
+    # Backtest every combination of the configured grid instead of one run;
+    # parameters not in the grid keep their command line values
+    if args.sweep_config:
+        param_grid = load_param_grid(args.sweep_config)
+        if param_grid is None:
+            return 1
+        # The numba engine runs the whole grid in one compiled call across all cores
+        if args.engine == 'numba':
+            # Imported here so Backtrader runs never load the compiled engine
+            from momentum_backtest_numba import run_sweep as run_numba_sweep
+            success = run_numba_sweep(data_file, param_grid, args.sweep_output,
+                                      start_cash=args.cash, commission=args.commission,
+                                      base_params=numba_params(strategy_params))
+        else:
+            success = run_grid_sweep(
+                MarketMomentumStrategy, data_file, param_grid, args.sweep_output,
+                start_cash=args.cash, commission=args.commission, workers=args.workers,
+                base_params=strategy_params)
+        return 0 if success else 1
+    
     # Run the backtest
-    success = run_strategy_backtest(
-        strategy_class=MarketMomentumStrategy,
-        data_file=data_file,
-        output_file=args.output,
-        start_cash=args.cash,
-        commission=args.commission,
-        plot=not args.no_plot,
-        strategy_params=strategy_params
-    )
+    if args.engine == 'numba':
+        from momentum_backtest_numba import run_backtest as run_numba_backtest
+        success = run_numba_backtest(
+            data_file=data_file,
+            output_file=output_path(args.output, args.format),
+            start_cash=args.cash,
+            commission=args.commission,
+            **numba_params(strategy_params)
+        )
+    else:
+        success = run_strategy_backtest(
+            strategy_class=MarketMomentumStrategy,
+            data_file=data_file,
+            output_file=output_path(args.output, args.format),
+            start_cash=args.cash,
+            commission=args.commission,
+            plot=not args.no_plot,
+            strategy_params=strategy_params
+        )
     
     if success:
         print("Backtest completed successfully")
-        sys.exit(0)
+        return 0
     else:
         print("Backtest failed")
-        sys.exit(1) 
\ No newline at end of file
+        return 1
+
+
+if __name__ == '__main__':
+    parser = parse_common_args()
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -5,71 +5,133 @@
 Run the Rebound Strategy backtest using the shared strategy runner
 """
 
+import os
 import sys
+import numpy as np
 from data_handler import download_spy_data
 from strategies.rebound_strategy import ReboundStrategy
-from strategy_runner import run_strategy_backtest, parse_common_args
+from strategy_runner import run_strategy_backtest, run_grid_sweep, load_param_grid, parse_common_args
+from utils.results import output_path
+from utils._njit import njit
+
+
+@njit(cache=True)
+def _pct_change_series(close, purchase_prices):
+    """Percent change of close from the purchase price, NaN while flat"""
+    out = np.empty_like(close)
+    for i in range(close.shape[0]):
+        pp = purchase_prices[i]
+        out[i] = (close[i] - pp) / pp * 100 if pp > 0 else np.nan
+    return out
 
 
 def get_rebound_csv_fields():
     """Get the extra CSV fields specific to the Rebound strategy"""
     def get_purchase_price(strategy):
-        return strategy.purchase_price if hasattr(strategy, 'purchase_price') else float('nan')
+        purchase_price = getattr(strategy, 'purchase_price', None)
+        return purchase_price if purchase_price is not None else float('nan')
     
-    def get_price_change_pct(strategy):
-        if hasattr(strategy, 'purchase_price') and strategy.purchase_price and strategy.position:
-            return (strategy.data.close[0] - strategy.purchase_price) / strategy.purchase_price * 100
-        return float('nan')
+    return [
+        ('PurchasePrice', get_purchase_price)
+    ]
+
+
+def get_rebound_derived_fields():
+    """Get the CSV fields computed from the recorded Rebound strategy columns"""
+    def get_price_change_pct(columns):
+        return _pct_change_series(columns['Close'], columns['PurchasePrice'])
     
     return [
-        ('PurchasePrice', get_purchase_price),
         ('PriceChangePct', get_price_change_pct)
     ]
 
 
-if __name__ == '__main__':
-    # Parse command line arguments
-    parser = parse_common_args()
-    
-    # Add strategy-specific arguments
-    parser.add_argument('--drop', type=float, default=0.10, help='Drop threshold (e.g., 0.10 for 10%)')
-    parser.add_argument('--rise', type=float, default=0.20, help='Rise threshold (e.g., 0.20 for 20%)')
+def add_arguments(parser):
+    """Add the Rebound strategy arguments to a parser from parse_common_args"""
+    parser.add_argument('--drop', type=float, default=0.10, help='Drop threshold (e.g., 0.10 for 10%%)')
+    parser.add_argument('--rise', type=float, default=0.20, help='Rise threshold (e.g., 0.20 for 20%%)')
     parser.add_argument('--lookback', type=int, default=5, help='Lookback period in days')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--engine', type=str, default='backtrader', choices=['backtrader', 'numba'],
+                        help='Backtest engine (numba skips Backtrader and does not plot)')
+    parser.add_argument('--sweep-config', type=str, default=None,
+                        help='JSON file mapping strategy parameters to lists of values to sweep (spread over --workers processes)')
+    parser.add_argument('--sweep-output', type=str, default='sweep_results.csv',
+                        help='Path to save the sweep summary CSV file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes for the sweep')
+
+
+def main(args):
+    """Run the Rebound backtest for parsed command line arguments and return the exit code"""
     # Download data if requested
     if args.download:
         print(f"Downloading fresh data from {args.start_date} to {args.end_date}...")
         data_file = download_spy_data(args.start_date, args.end_date, args.data)
         if not data_file:
             print("Error: Failed to download data")
-            sys.exit(1)
+            return 1
     else:
         data_file = args.data
     
-    # Set up strategy parameters
+    # Set up strategy parameters (shared by every run of a sweep)
     strategy_params = {
         'drop_threshold': args.drop,
         'rise_threshold': args.rise,
         'lookback_period': args.lookback
     }
     
+    # Backtest every combination of the configured grid instead of one run;
+    # parameters not in the grid keep their command line values
+    if args.sweep_config:
+        param_grid = load_param_grid(args.sweep_config)
+        if param_grid is None:
+            return 1
+        # The numba engine runs the whole grid in one compiled call across all cores
+        if args.engine == 'numba':
+            # Imported here so Backtrader runs never compile the kernel
+            from rebound_backtest_numba import run_sweep as run_numba_sweep
+            success = run_numba_sweep(data_file, param_grid, args.sweep_output,
+                                      start_cash=args.cash, commission=args.commission,
+                                      base_params=strategy_params)
+        else:
+            success = run_grid_sweep(
+                ReboundStrategy, data_file, param_grid, args.sweep_output,
+                start_cash=args.cash, commission=args.commission, workers=args.workers,
+                base_params=strategy_params)
+        return 0 if success else 1
+    
     # Run the backtest
-    success = run_strategy_backtest(
-        strategy_class=ReboundStrategy,
-        data_file=data_file,
-        output_file=args.output,
-        start_cash=args.cash,
-        commission=args.commission,
-        plot=not args.no_plot,
-        strategy_params=strategy_params,
-        csv_fields=get_rebound_csv_fields()
-    )
+    if args.engine == 'numba':
+        from rebound_backtest_numba import run_backtest as run_numba_backtest
+        success = run_numba_backtest(
+            data_file=data_file,
+            output_file=output_path(args.output, args.format),
+            start_cash=args.cash,
+            commission=args.commission,
+            **strategy_params
+        )
+    else:
+        success = run_strategy_backtest(
+            strategy_class=ReboundStrategy,
+            data_file=data_file,
+            output_file=output_path(args.output, args.format),
+            start_cash=args.cash,
+            commission=args.commission,
+            plot=not args.no_plot,
+            strategy_params=strategy_params,
+            csv_fields=get_rebound_csv_fields(),
+            csv_derived_fields=get_rebound_derived_fields()
+        )
     
     if success:
         print("Backtest completed successfully")
-        sys.exit(0)
+        return 0
     else:
         print("Backtest failed")
-        sys.exit(1) 
\ No newline at end of file
+        return 1
+
+
+if __name__ == '__main__':
+    parser = parse_common_args()
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
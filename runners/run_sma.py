@@ -5,19 +5,27 @@
 Run the SMA Crossover Strategy backtest using the shared strategy runner
 """
 
+import os
 import sys
 from data_handler import download_spy_data
 from strategies.sma_crossover_strategy import SmaCrossStrategy
 from strategy_runner import run_strategy_backtest, parse_common_args
+from utils.results import output_path
 
 
 def get_sma_csv_fields():
     """Get the extra CSV fields specific to the SMA Crossover strategy"""
     def get_fast_sma(strategy):
-        return strategy.fast_sma[0] if hasattr(strategy, 'fast_sma') else float('nan')
+        fast_sma = getattr(strategy, 'fast_sma_array', None)
+        if fast_sma is not None:
+            return fast_sma[len(strategy.data) - 1]
+        return float('nan')
     
     def get_slow_sma(strategy):
-        return strategy.slow_sma[0] if hasattr(strategy, 'slow_sma') else float('nan')
+        slow_sma = getattr(strategy, 'slow_sma_array', None)
+        if slow_sma is not None:
+            return slow_sma[len(strategy.data) - 1]
+        return float('nan')
     
     return [
         ('FastSMA', get_fast_sma),
@@ -25,26 +33,49 @@ def get_sma_csv_fields():
     ]
 
 
-if __name__ == '__main__':
-    # Parse command line arguments
-    parser = parse_common_args()
-    
-    # Add strategy-specific arguments
+def add_arguments(parser):
+    """Add the SMA Crossover strategy arguments to a parser from parse_common_args"""
     parser.add_argument('--fast', type=int, default=50, help='Fast SMA period')
     parser.add_argument('--slow', type=int, default=200, help='Slow SMA period')
-    
-    args = parser.parse_args()
-    
+    parser.add_argument('--engine', type=str, default='backtrader', choices=['backtrader', 'numba', 'vector'],
+                        help='Backtest engine (numba and vector skip Backtrader and do not plot)')
+    parser.add_argument('--sweep', action='store_true',
+                        help='Backtest every (fast, slow) pair from --fast-range and --slow-range in parallel')
+    parser.add_argument('--fast-range', type=str, default=None,
+                        help="Fast SMA periods to sweep, as 'start:stop:step' or a comma-separated list")
+    parser.add_argument('--slow-range', type=str, default=None,
+                        help="Slow SMA periods to sweep, as 'start:stop:step' or a comma-separated list")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes for the sweep')
+    parser.add_argument('--sweep-output', type=str, default='sweep_results.csv',
+                        help='Path to save the sweep summary CSV file')
+
+
+def main(args):
+    """Run the SMA Crossover backtest for parsed command line arguments and return the exit code"""
     # Download data if requested
     if args.download:
         print(f"Downloading fresh data from {args.start_date} to {args.end_date}...")
         data_file = download_spy_data(args.start_date, args.end_date, args.data)
         if not data_file:
             print("Error: Failed to download data")
-            sys.exit(1)
+            return 1
     else:
         data_file = args.data
     
+    # Sweep the parameter grid with the same parallel runner as run_analysis.py,
+    # or in a single parallel kernel call with the numba engine
+    if args.sweep:
+        from run_analysis import run_sweep, sweep_pairs
+        args.data = data_file
+        if args.engine == 'numba':
+            from sma_backtest_numba import run_sweep as run_numba_sweep
+            success = run_numba_sweep(data_file, sweep_pairs(args), args.sweep_output,
+                                      args.cash, args.commission)
+        else:
+            success = run_sweep(args)
+        return 0 if success else 1
+    
     # Set up strategy parameters
     strategy_params = {
         'fast_period': args.fast,
@@ -52,20 +83,41 @@ if __name__ == '__main__':
     }
     
     # Run the backtest
-    success = run_strategy_backtest(
-        strategy_class=SmaCrossStrategy,
-        data_file=data_file,
-        output_file=args.output,
-        start_cash=args.cash,
-        commission=args.commission,
-        plot=not args.no_plot,
-        strategy_params=strategy_params,
-        csv_fields=get_sma_csv_fields()
-    )
+    if args.engine in ('numba', 'vector'):
+        # Imported here so Backtrader runs never compile or load the kernel
+        if args.engine == 'numba':
+            from sma_backtest_numba import run_backtest as run_fast_backtest
+        else:
+            from vector_backtest import run_backtest as run_fast_backtest
+        success = run_fast_backtest(
+            data_file=data_file,
+            output_file=output_path(args.output, args.format),
+            fast_period=args.fast,
+            slow_period=args.slow,
+            start_cash=args.cash,
+            commission=args.commission
+        )
+    else:
+        success = run_strategy_backtest(
+            strategy_class=SmaCrossStrategy,
+            data_file=data_file,
+            output_file=output_path(args.output, args.format),
+            start_cash=args.cash,
+            commission=args.commission,
+            plot=not args.no_plot,
+            strategy_params=strategy_params,
+            csv_fields=get_sma_csv_fields()
+        )
     
     if success:
         print("Backtest completed successfully")
-        sys.exit(0)
+        return 0
     else:
         print("Backtest failed")
-        sys.exit(1) 
\ No newline at end of file
+        return 1
+
+
+if __name__ == '__main__':
+    parser = parse_common_args()
+    add_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Numba SMA Crossover Backtest
+Runs the SMA Crossover strategy as a single compiled loop over NumPy arrays
+instead of Backtrader's per-bar Python callbacks. Reproduces the fills of
+SmaCrossStrategy (market orders filled at the next bar's open) and writes the
+same columns as the CSVWriter analyzer used by runners/run_sma.py.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_handler import check_and_fix_csv, read_price_columns
+from utils._njit import njit, prange
+from utils.metrics import compute_metrics, print_summary, trade_stats
+from utils.results import save_results_frame
+
+
+# (open, close, fast_period, slow_period, start_cash, commission) ->
+# (position, cash, portfolio_value, fast_sma, slow_sma), all C-contiguous
+SIMULATE_SIGNATURE = (
+    'Tuple((i8[::1], f8[::1], f8[::1], f8[::1], f8[::1]))'
+    '(f8[::1], f8[::1], i8, i8, f8, f8)'
+)
+
+
+# The explicit signature compiles the kernel at import time
+@njit(SIMULATE_SIGNATURE, cache=True, fastmath=True, boundscheck=False,
+      error_model='numpy')
+def simulate(open_, close, fast_p, slow_p, cash0, comm):
+    """
+    Simulate the SMA crossover strategy bar by bar
+
+    Returns arrays (position, cash, portfolio_value, fast_sma, slow_sma),
+    each holding the value seen at the close of every bar.
+    """
+    n = close.shape[0]
+    position_arr = np.zeros(n, dtype=np.int64)
+    cash_arr = np.empty(n, dtype=np.float64)
+    portfolio_value = np.empty(n, dtype=np.float64)
+    fast_sma_arr = np.full(n, np.nan)
+    slow_sma_arr = np.full(n, np.nan)
+
+    # Backtrader's CrossOver needs one bar more than the slowest SMA
+    max_p = max(fast_p, slow_p)
+
+    cash = cash0
+    position = 0
+    fast_sum = 0.0
+    slow_sum = 0.0
+    last_diff = 0.0
+
+    # Order created on the previous bar: size > 0 buys, size < 0 closes
+    pending_size = 0
+    pending_price = 0.0
+
+    for i in range(n):
+        # Execute the pending order at this bar's open
+        if pending_size > 0:
+            # The broker checks the cash at the creation price and again at
+            # the fill price, rejecting the order if either would overdraw
+            created_value = pending_size * pending_price
+            value = pending_size * open_[i]
+            if (cash - created_value - created_value * comm >= 0.0
+                    and cash - value - value * comm >= 0.0):
+                cash -= value + value * comm
+                position += pending_size
+        elif pending_size < 0:
+            value = position * open_[i]
+            cash += value - value * comm
+            position = 0
+        pending_size = 0
+
+        # Update both rolling sums in the same pass
+        fast_sum += close[i]
+        slow_sum += close[i]
+        if i >= fast_p:
+            fast_sum -= close[i - fast_p]
+        if i >= slow_p:
+            slow_sum -= close[i - slow_p]
+        if i >= fast_p - 1:
+            fast_sma_arr[i] = fast_sum / fast_p
+        if i >= slow_p - 1:
+            slow_sma_arr[i] = slow_sum / slow_p
+
+        # Crossover against the last non-zero difference (as bt.CrossOver)
+        if i >= max_p - 1:
+            diff = fast_sma_arr[i] - slow_sma_arr[i]
+            if i >= max_p:
+                crossover = 0
+                if last_diff < 0.0 and diff > 0.0:
+                    crossover = 1
+                elif last_diff > 0.0 and diff < 0.0:
+                    crossover = -1
+
+                if position == 0:
+                    if crossover > 0:
+                        size = int(cash / close[i])
+                        if size > 0:
+                            pending_size = size
+                            pending_price = close[i]
+                elif crossover < 0:
+                    pending_size = -1
+                    pending_price = close[i]
+
+            if diff != 0.0 or i == max_p - 1:
+                last_diff = diff
+
+        position_arr[i] = position
+        cash_arr[i] = cash
+        portfolio_value[i] = cash + position * close[i]
+
+    return position_arr, cash_arr, portfolio_value, fast_sma_arr, slow_sma_arr
+
+
+@njit(cache=True, parallel=True)
+def sweep(open_, close, fast_periods, slow_periods, cash0, comm):
+    """
+    Simulate every (fast_periods[k], slow_periods[k]) pair across all cores
+
+    Returns the portfolio value and position arrays of pair k in row k of
+    two matrices.
+    """
+    n_pairs = fast_periods.shape[0]
+    portfolio_values = np.empty((n_pairs, close.shape[0]), dtype=np.float64)
+    positions = np.empty((n_pairs, close.shape[0]), dtype=np.int64)
+    for k in prange(n_pairs):
+        position, _, portfolio_value, _, _ = simulate(open_, close, fast_periods[k],
+                                                      slow_periods[k], cash0, comm)
+        portfolio_values[k, :] = portfolio_value
+        positions[k, :] = position
+    return portfolio_values, positions
+
+
+# Prefer the ahead-of-time build (python build_aot.py) to skip the JIT compile
+try:
+    from sma_backtest_aot import simulate as compiled_simulate
+except ImportError:
+    compiled_simulate = simulate
+
+
+def run_backtest(data_file, output_file='strategy_results.csv', fast_period=50,
+                 slow_period=200, start_cash=10000.0, commission=0.001):
+    """
+    Run the compiled SMA crossover backtest and save results to CSV (or
+    Parquet/Feather, by the extension of output_file)
+
+    Parameters:
+    - data_file: Path to the data file
+    - output_file: Path to save results
+    - fast_period: Fast SMA period
+    - slow_period: Slow SMA period
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    """
+    # Check (and repair) the data file, as the Backtrader engine does
+    if not check_and_fix_csv(data_file):
+        return False
+
+    try:
+        # Load only the columns the kernel needs
+        print(f"Loading data from {data_file}...")
+        df = read_price_columns(data_file, ['Date', 'Open', 'Close'])
+        # The typed kernel takes writable, C-contiguous float64 arrays
+        open_ = np.require(df['Open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        close = np.require(df['Close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+
+        print(f'Starting Portfolio Value: {start_cash:.2f}')
+        print("Running backtest...")
+        position, cash, portfolio_value, fast_sma, slow_sma = compiled_simulate(
+            open_, close, int(fast_period), int(slow_period),
+            float(start_cash), float(commission))
+
+        # Save the same columns as the CSVWriter analyzer
+        results_df = pd.DataFrame({
+            'Date': df['Date'],
+            'Close': close,
+            'Position': position,
+            'Cash': cash,
+            'PortfolioValue': portfolio_value,
+            'FastSMA': fast_sma,
+            'SlowSMA': slow_sma
+        })
+        save_results_frame(results_df, output_file)
+
+        print(f'Final Portfolio Value: {portfolio_value[-1]:.2f}')
+
+        # Summarize the run in the same format as the Backtrader engine
+        metrics = {'final_value': float(portfolio_value[-1]), **compute_metrics(portfolio_value),
+                   **trade_stats(position, open_, commission)}
+        print_summary(metrics)
+
+        print(f"Backtest results saved to {output_file}")
+        return metrics
+
+    except Exception as e:
+        print(f"Error running backtest: {e}")
+        return False
+
+
+def run_sweep(data_file, pairs, sweep_output='sweep_results.csv',
+              start_cash=10000.0, commission=0.001):
+    """
+    Run the compiled SMA crossover backtest over every (fast, slow) pair in
+    one parallel kernel call and save the summary metrics to a single CSV
+
+    Parameters:
+    - data_file: Path to the data file
+    - pairs: List of (fast_period, slow_period) tuples
+    - sweep_output: Path to save the sweep summary
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    """
+    # Check (and repair) the data file, as the Backtrader engine does
+    if not check_and_fix_csv(data_file):
+        return False
+
+    if not pairs:
+        print("Error: No (fast, slow) pairs with slow > fast to sweep")
+        return False
+
+    try:
+        # Load the prices once for the whole grid
+        print(f"Loading data from {data_file}...")
+        df = read_price_columns(data_file, ['Date', 'Open', 'Close'])
+        open_ = np.require(df['Open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        close = np.require(df['Close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+        fast_periods = np.array([fast for fast, _ in pairs], dtype=np.int64)
+        slow_periods = np.array([slow for _, slow in pairs], dtype=np.int64)
+
+        print(f"Sweeping {len(pairs)} parameter pairs in one compiled call...")
+        portfolio_values, positions = sweep(open_, close, fast_periods, slow_periods,
+                                            float(start_cash), float(commission))
+
+        # Summarize each run with the same metrics as the Backtrader sweep
+        rows = []
+        for k, (fast, slow) in enumerate(pairs):
+            rows.append({'fast': fast, 'slow': slow,
+                         'final_value': portfolio_values[k, -1],
+                         **compute_metrics(portfolio_values[k]),
+                         **trade_stats(positions[k], open_, commission)})
+
+        sweep_df = pd.DataFrame(rows).sort_values(['fast', 'slow'])
+        sweep_df.to_csv(sweep_output, index=False)
+        print(f"Sweep results saved to {sweep_output}")
+        return True
+
+    except Exception as e:
+        print(f"Error running sweep: {e}")
+        return False
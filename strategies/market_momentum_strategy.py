@@ -10,8 +10,17 @@ It uses multiple entry signals and trailing stops to capture more opportunities.
 import backtrader as bt
 import datetime
 import os.path
+import sys
+import numpy as np
 import pandas as pd
 
+from strategies.precomputed_indicators import (PrecomputedATR, PrecomputedMACD,
+                                               PrecomputedRSI, PrecomputedSMA)
+from strategy_runner import run_strategy_backtest
+
+# backtrader.talib only defines its indicators when TA-Lib is installed
+TALIB_AVAILABLE = hasattr(bt.talib, 'SMA')
+
 
 class MarketMomentumStrategy(bt.Strategy):
     """
@@ -29,42 +38,89 @@ class MarketMomentumStrategy(bt.Strategy):
         ('rsi_overbought', 70),   # RSI overbought threshold
         ('trail_percent', 0.07),  # Trailing stop percentage (7%)
         ('risk_per_trade', 0.5),  # Risk 50% of available cash per entry signal
+        ('use_talib', False),     # Compute the indicators with TA-Lib's C functions
+        ('quiet', False),         # Drop the trade log instead of printing it
     )
     
     def __init__(self):
-        # Initialize indicators
-        self.fast_ma = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.params.fast_ma)
-        self.medium_ma = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.params.medium_ma)
+        if self.params.use_talib and not TALIB_AVAILABLE:
+            print("TA-Lib is not installed, using the precomputed indicators")
+        
+        if self.params.use_talib and TALIB_AVAILABLE:
+            self._init_talib_indicators()
+        else:
+            self._init_indicators()
+        
+        # To keep track of pending orders
+        self.order = None
+        
+        # To keep track of trailing stop orders
+        self.trailing_stop = None
+        
+        # Lines read by next(), one column each in the bar matrix
+        self._bar_lines = (self.data.close, self.fast_ma.lines[0], self.medium_ma.lines[0],
+                           self.rsi.lines[0], self.macd_line, self.macd_signal_line)
+        self._bars = None
+        
+        # Parameters read on every bar, bound once as plain attributes
+        self._trail_percent = self.params.trail_percent
+        self._risk_per_trade = self.params.risk_per_trade
+        self._rsi_oversold = self.params.rsi_oversold
+        self._rsi_overbought = self.params.rsi_overbought
+        
+        # Trade log entries, printed together when the backtest stops
+        self._quiet = self.params.quiet
+        self._events = []
+    
+    def _init_indicators(self):
+        """Create the indicators, each computed once over the whole feed"""
+        self.fast_ma = PrecomputedSMA(self.data.close, period=self.params.fast_ma)
+        self.medium_ma = PrecomputedSMA(self.data.close, period=self.params.medium_ma)
         
         # RSI indicator
-        self.rsi = bt.indicators.RelativeStrengthIndex(
-            period=self.params.rsi_period)
+        self.rsi = PrecomputedRSI(self.data.close, period=self.params.rsi_period)
         
         # MACD for trend strength
-        self.macd = bt.indicators.MACD(
+        self.macd = PrecomputedMACD(
             self.data.close,
             period_me1=12,
             period_me2=26,
             period_signal=9)
+        self.macd_line = self.macd.macd
+        self.macd_signal_line = self.macd.signal
         
         # ATR for volatility measurement
-        self.atr = bt.indicators.ATR(period=14)
+        self.atr = PrecomputedATR(self.data, period=14)
+    
+    def _init_talib_indicators(self):
+        """Create the same indicators with TA-Lib, computed over the whole feed in C"""
+        self.fast_ma = bt.talib.SMA(self.data.close, timeperiod=self.params.fast_ma)
+        self.medium_ma = bt.talib.SMA(self.data.close, timeperiod=self.params.medium_ma)
         
-        # To keep track of pending orders
-        self.order = None
+        # RSI indicator
+        self.rsi = bt.talib.RSI(self.data.close, timeperiod=self.params.rsi_period)
         
-        # To keep track of trailing stop orders
-        self.trailing_stop = None
+        # MACD for trend strength
+        self.macd = bt.talib.MACD(self.data.close, fastperiod=12, slowperiod=26,
+                                  signalperiod=9)
+        self.macd_line = self.macd.macd
+        self.macd_signal_line = self.macd.macdsignal
         
-        # Set the sizer to use percentage of available cash
-        self.sizer = bt.sizers.PercentSizer(percents=self.params.risk_per_trade * 100)
+        # ATR for volatility measurement
+        self.atr = bt.talib.ATR(self.data.high, self.data.low, self.data.close,
+                                timeperiod=14)
         
     def log(self, txt, dt=None):
-        """Logging function for this strategy"""
-        dt = dt or self.datas[0].datetime.date(0)
-        print(f'{dt.isoformat()} {txt}')
+        """Logging function for this strategy, buffered until stop()"""
+        if not self._quiet:
+            self._events.append((dt or self.datas[0].datetime.date(0), txt))
+
+    def stop(self):
+        """Print the buffered trade log in one write"""
+        if self._events:
+            sys.stdout.write(''.join(f'{dt.isoformat()} {txt}\n' for dt, txt in self._events))
+            sys.stdout.flush()
+            self._events = []
 
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
@@ -77,9 +133,9 @@ class MarketMomentumStrategy(bt.Strategy):
                 self.log(f'BUY EXECUTED, {order.executed.price:.2f}, Size: {order.executed.size}, Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}')
                 # Set trailing stop if not already set
                 if not self.trailing_stop:
-                    stop_price = order.executed.price * (1.0 - self.params.trail_percent)
+                    stop_price = order.executed.price * (1.0 - self._trail_percent)
                     self.trailing_stop = order.executed.price
-                    self.log(f'TRAILING STOP SET AT {stop_price:.2f} ({self.params.trail_percent:.1%} below entry)')
+                    self.log(f'TRAILING STOP SET AT {stop_price:.2f} ({self._trail_percent:.1%} below entry)')
             elif order.issell():
                 self.log(f'SELL EXECUTED, {order.executed.price:.2f}, Size: {order.executed.size}, Cost: {order.executed.value:.2f}, Comm: {order.executed.comm:.2f}')
                 # Reset trailing stop if position is closed
@@ -92,24 +148,44 @@ class MarketMomentumStrategy(bt.Strategy):
         # Reset orders
         self.order = None
 
+    def nextstart(self):
+        """Gather the lines next() reads into one matrix before the first bar"""
+        # With a preloaded feed in runonce mode every line already spans it
+        buflen = self.data.buflen()
+        if len(self.data) < buflen and all(len(line.array) >= buflen
+                                           for line in self._bar_lines):
+            self._bars = np.column_stack([
+                np.frombuffer(line.array, dtype=np.float64)[:buflen]
+                for line in self._bar_lines])
+        self.next()
+
+    def _bar_rows(self):
+        """Return the previous and current bar's values of self._bar_lines"""
+        if self._bars is not None:
+            i = len(self.data) - 1
+            return self._bars[i - 1:i + 1].tolist()
+        return ([line[-1] for line in self._bar_lines],
+                [line[0] for line in self._bar_lines])
+
     def next(self):
         # Check if an order is pending
         if self.order:
             return
 
-        # Current closing price
-        current_price = self.data.close[0]
+        # Previous and current close, moving averages, RSI and MACD lines
+        ((prev_price, prev_fast_ma, prev_medium_ma, prev_rsi, prev_macd, prev_macd_signal),
+         (current_price, fast_ma, medium_ma, rsi, macd, macd_signal_line)) = self._bar_rows()
         
         # Update trailing stop if we have a position
         if self.position and self.trailing_stop:
             # If price has moved up, move the trailing stop up
-            if current_price > self.trailing_stop * (1.0 + self.params.trail_percent):
-                new_stop = current_price * (1.0 - self.params.trail_percent)
+            if current_price > self.trailing_stop * (1.0 + self._trail_percent):
+                new_stop = current_price * (1.0 - self._trail_percent)
                 self.trailing_stop = current_price
                 self.log(f'TRAILING STOP UPDATED TO {new_stop:.2f}')
             
             # Check if price has hit the trailing stop
-            if current_price < self.trailing_stop * (1.0 - self.params.trail_percent):
+            if current_price < self.trailing_stop * (1.0 - self._trail_percent):
                 self.log(f'TRAILING STOP HIT, SELLING AT {current_price:.2f}')
                 # Calculate position size to sell (all shares)
                 size = self.position.size
@@ -119,26 +195,26 @@ class MarketMomentumStrategy(bt.Strategy):
                 return
         
         # Entry signals
-        if not self.position or self.position.size < 3 * int(self.broker.getcash() / current_price * self.params.risk_per_trade):
+        cash = self.broker.getcash()
+        if not self.position or self.position.size < 3 * int(cash / current_price * self._risk_per_trade):
             # Signal 1: Fast MA crosses above Medium MA (uptrend)
-            uptrend = self.fast_ma[0] > self.medium_ma[0] and self.fast_ma[-1] <= self.medium_ma[-1]
+            uptrend = fast_ma > medium_ma and prev_fast_ma <= prev_medium_ma
             
             # Signal 2: RSI crosses above oversold level (momentum shift)
-            rsi_signal = self.rsi[0] > self.params.rsi_oversold and self.rsi[-1] <= self.params.rsi_oversold
+            rsi_signal = rsi > self._rsi_oversold and prev_rsi <= self._rsi_oversold
             
             # Signal 3: MACD histogram turns positive (momentum confirmation)
-            macd_signal = self.macd.macd[0] > self.macd.signal[0] and self.macd.macd[-1] <= self.macd.signal[-1]
+            macd_signal = macd > macd_signal_line and prev_macd <= prev_macd_signal
             
             # Signal 4: Price pullback in uptrend (buying dips)
-            pullback = (self.fast_ma[0] > self.medium_ma[0] and 
-                       current_price < self.fast_ma[0] and 
-                       current_price > self.data.close[-1])
+            pullback = (fast_ma > medium_ma and 
+                       current_price < fast_ma and 
+                       current_price > prev_price)
             
             # If any of the signals are triggered, enter the market
             if uptrend or rsi_signal or macd_signal or pullback:
                 # Calculate position size based on available cash and risk parameter
-                cash = self.broker.getcash()
-                risk_amount = cash * self.params.risk_per_trade
+                risk_amount = cash * self._risk_per_trade
                 size = int(risk_amount / current_price)
                 
                 if size > 0:
@@ -150,7 +226,7 @@ class MarketMomentumStrategy(bt.Strategy):
                     
                     signal_str = ", ".join(signal_type)
                     self.log(f'BUY SIGNAL: {signal_str}')
-                    self.log(f'BUY CREATE, {current_price:.2f}, RSI: {self.rsi[0]:.1f}')
+                    self.log(f'BUY CREATE, {current_price:.2f}, RSI: {rsi:.1f}')
                     self.log(f'Using {size * current_price:.2f} of {cash:.2f} available cash to buy {size} shares')
                     
                     # Keep track of the created order to avoid a 2nd order
@@ -159,13 +235,13 @@ class MarketMomentumStrategy(bt.Strategy):
         # Exit signals (in addition to trailing stop)
         elif self.position:
             # Signal 1: RSI overbought
-            rsi_exit = self.rsi[0] > self.params.rsi_overbought
+            rsi_exit = rsi > self._rsi_overbought
             
             # Signal 2: Fast MA crosses below Medium MA (downtrend)
-            downtrend = self.fast_ma[0] < self.medium_ma[0] and self.fast_ma[-1] >= self.medium_ma[-1]
+            downtrend = fast_ma < medium_ma and prev_fast_ma >= prev_medium_ma
             
             # Signal 3: MACD histogram turns negative
-            macd_exit = self.macd.macd[0] < self.macd.signal[0] and self.macd.macd[-1] >= self.macd.signal[-1]
+            macd_exit = macd < macd_signal_line and prev_macd >= prev_macd_signal
             
             # If any exit signal is triggered, exit the market
             if rsi_exit or downtrend or macd_exit:
@@ -176,7 +252,7 @@ class MarketMomentumStrategy(bt.Strategy):
                 
                 signal_str = ", ".join(signal_type)
                 self.log(f'SELL SIGNAL: {signal_str}')
-                self.log(f'SELL CREATE, {current_price:.2f}, RSI: {self.rsi[0]:.1f}')
+                self.log(f'SELL CREATE, {current_price:.2f}, RSI: {rsi:.1f}')
                 
                 # Calculate position size to sell (all shares)
                 size = self.position.size
@@ -190,82 +266,47 @@ class MarketMomentumStrategy(bt.Strategy):
 def run_backtest(data_file, start_cash=10000.0, commission=0.001, 
                 fast_ma=10, medium_ma=30, rsi_period=14, 
                 rsi_oversold=40, rsi_overbought=70, 
-                trail_percent=0.07, risk_per_trade=0.5):
-    """Run the backtest with the given parameters"""
-    # Create a cerebro entity
-    cerebro = bt.Cerebro()
+                trail_percent=0.07, risk_per_trade=0.5,
+                output_file=None, plot=True):
+    """
+    Run the backtest with the given parameters through the shared strategy runner
 
-    # Add the Market Momentum Strategy
-    cerebro.addstrategy(MarketMomentumStrategy, 
-                       fast_ma=fast_ma,
-                       medium_ma=medium_ma,
-                       rsi_period=rsi_period,
-                       rsi_oversold=rsi_oversold,
-                       rsi_overbought=rsi_overbought,
-                       trail_percent=trail_percent,
-                       risk_per_trade=risk_per_trade)
+    Without a plot there is nothing Backtrader is needed for, so the compiled
+    kernel from momentum_backtest_numba runs the strategy instead of cerebro.
+    """
+    if not plot:
+        # Imported here so Backtrader runs never compile the kernel
+        from momentum_backtest_numba import run_backtest as run_numba_backtest
+        return run_numba_backtest(
+            data_file, output_file=output_file, fast_ma=fast_ma, medium_ma=medium_ma,
+            rsi_period=rsi_period, rsi_oversold=rsi_oversold,
+            rsi_overbought=rsi_overbought, trail_percent=trail_percent,
+            risk_per_trade=risk_per_trade, start_cash=start_cash,
+            commission=commission)
     
-    # Set the default sizer to use percentage of available cash
-    cerebro.addsizer(bt.sizers.PercentSizer, percents=risk_per_trade * 100)
-
-    # Load the data
-    data = bt.feeds.GenericCSVData(
-        dataname=data_file,
-        dtformat='%Y-%m-%d',
-        datetime=0,
-        open=1,
-        high=2,
-        low=3,
-        close=4,
-        volume=5,
-        openinterest=6
+    return run_strategy_backtest(
+        strategy_class=MarketMomentumStrategy,
+        data_file=data_file,
+        output_file=output_file,
+        start_cash=start_cash,
+        commission=commission,
+        plot=plot,
+        strategy_params={
+            'fast_ma': fast_ma,
+            'medium_ma': medium_ma,
+            'rsi_period': rsi_period,
+            'rsi_oversold': rsi_oversold,
+            'rsi_overbought': rsi_overbought,
+            'trail_percent': trail_percent,
+            'risk_per_trade': risk_per_trade
+        }
     )
 
-    # Add the Data Feed to Cerebro
-    cerebro.adddata(data)
-
-    # Set our desired cash start
-    cerebro.broker.setcash(start_cash)
-
-    # Set the commission
-    cerebro.broker.setcommission(commission=commission)
-
-    # Add analyzers
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
-
-    # Print out the starting conditions
-    print(f'Starting Portfolio Value: {cerebro.broker.getvalue():.2f}')
-
-    # Run the backtest
-    results = cerebro.run()
-    
-    # Print out the final result
-    print(f'Final Portfolio Value: {cerebro.broker.getvalue():.2f}')
-    
-    # Print analyzer results
-    strategy = results[0]
-    print(f"Sharpe Ratio: {strategy.analyzers.sharpe.get_analysis().get('sharperatio', 0.0):.3f}")
-    print(f"Max Drawdown: {strategy.analyzers.drawdown.get_analysis().get('max', {}).get('drawdown', 0.0):.2f}%")
-    print(f"Total Return: {strategy.analyzers.returns.get_analysis().get('rtot', 0.0):.2f}%")
-    
-    # Print trade statistics
-    trade_analysis = strategy.analyzers.trades.get_analysis()
-    print(f"Total Trades: {trade_analysis.get('total', 0)}")
-    print(f"Win Rate: {trade_analysis.get('won', 0) / trade_analysis.get('total', 1) * 100:.2f}% ({trade_analysis.get('won', 0)}/{trade_analysis.get('total', 0)})")
-    
-    # Plot the result
-    cerebro.plot(style='candlestick', barup='green', bardown='red')
-    
-    return True
-
 
 if __name__ == '__main__':
     import argparse
     import sys
-    from data_handler import download_spy_data, check_and_fix_csv
+    from data_handler import check_and_fix_csv, download_spy_data
     
     parser = argparse.ArgumentParser(description='Run Market Momentum Strategy Backtest')
     parser.add_argument('--data', type=str, default='spy_data.csv', help='Data file to use')
@@ -277,7 +318,7 @@ if __name__ == '__main__':
     parser.add_argument('--rsi-oversold', type=int, default=40, help='RSI oversold threshold')
     parser.add_argument('--rsi-overbought', type=int, default=70, help='RSI overbought threshold')
     parser.add_argument('--trail-percent', type=float, default=0.07, help='Trailing stop percentage')
-    parser.add_argument('--risk-per-trade', type=float, default=0.5, help='Risk per trade (0.5 = 50% of available cash)')
+    parser.add_argument('--risk-per-trade', type=float, default=0.5, help='Risk per trade (0.5 = 50%% of available cash)')
     parser.add_argument('--no-plot', action='store_true', help='Disable plotting')
     parser.add_argument('--download', action='store_true', help='Download fresh data')
     parser.add_argument('--start-date', type=str, default='2000-01-01', help='Start date for data download')
@@ -316,7 +357,8 @@ if __name__ == '__main__':
         rsi_oversold=args.rsi_oversold,
         rsi_overbought=args.rsi_overbought,
         trail_percent=args.trail_percent,
-        risk_per_trade=args.risk_per_trade
+        risk_per_trade=args.risk_per_trade,
+        plot=not args.no_plot
     )
     
     if success:
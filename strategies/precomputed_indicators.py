@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Precomputed Indicators
+Backtrader indicators whose values are computed once over the whole preloaded
+feed with the compiled kernels in utils.indicators, instead of bar by bar in
+Python. In Backtrader's default runonce mode every line is written in a
+single step; in next mode each bar reads its value from the same arrays. The
+values match the built-in Backtrader indicators they replace.
+"""
+
+import array
+
+import backtrader as bt
+import numpy as np
+
+from utils.indicators import atr, macd, rsi, sma
+
+
+def line_values(line):
+    """Copy a Backtrader line buffer into a float64 NumPy array"""
+    return np.frombuffer(line.array, dtype=np.float64).copy()
+
+
+class PrecomputedIndicator(bt.Indicator):
+    """
+    Base class for indicators computed over the whole feed at once
+
+    Subclasses define compute(), which returns one float64 array per line
+    (in the order of lines), each covering every bar of the feed so far.
+    """
+
+    def __init__(self):
+        self._values = None
+
+    def next(self):
+        # Next mode: recompute only if the feed has grown past the arrays
+        i = len(self) - 1
+        if self._values is None or i >= len(self._values[0]):
+            self._values = self.compute()
+        for line, values in zip(self.lines, self._values):
+            line[0] = values[i]
+
+    def once(self, start, end):
+        # Runonce mode: compute every line the first time one is requested
+        if self._values is None:
+            self._values = self.compute()
+        for line, values in zip(self.lines, self._values):
+            line.array[start:end] = array.array('d', values[start:end])
+
+
+class PrecomputedSMA(PrecomputedIndicator):
+    """Drop-in replacement for bt.indicators.SimpleMovingAverage"""
+    lines = ('sma',)
+    params = (
+        ('period', 30),  # Moving average period
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.addminperiod(self.params.period)
+
+    def compute(self):
+        return (sma(line_values(self.data), int(self.params.period)),)
+
+
+class PrecomputedRSI(PrecomputedIndicator):
+    """Drop-in replacement for bt.indicators.RelativeStrengthIndex"""
+    lines = ('rsi',)
+    params = (
+        ('period', 14),  # RSI period
+    )
+
+    def __init__(self):
+        super().__init__()
+        # One bar for the first price change plus the smoothing period
+        self.addminperiod(self.params.period + 1)
+
+    def compute(self):
+        return (rsi(line_values(self.data), int(self.params.period)),)
+
+
+class PrecomputedMACD(PrecomputedIndicator):
+    """Drop-in replacement for bt.indicators.MACD"""
+    lines = ('macd', 'signal', 'histo')
+    params = (
+        ('period_me1', 12),    # Fast EMA period
+        ('period_me2', 26),    # Slow EMA period
+        ('period_signal', 9),  # Signal line EMA period
+    )
+
+    def __init__(self):
+        super().__init__()
+        # The signal line smooths the MACD line once the slow EMA has a value
+        self.addminperiod(max(self.params.period_me1, self.params.period_me2)
+                          + self.params.period_signal - 1)
+
+    def compute(self):
+        macd_line, signal = macd(line_values(self.data), int(self.params.period_me1),
+                                 int(self.params.period_me2),
+                                 int(self.params.period_signal))
+        return macd_line, signal, macd_line - signal
+
+
+class PrecomputedATR(PrecomputedIndicator):
+    """Drop-in replacement for bt.indicators.AverageTrueRange"""
+    lines = ('atr',)
+    params = (
+        ('period', 14),  # ATR period
+    )
+
+    def __init__(self):
+        super().__init__()
+        # One bar for the previous close plus the smoothing period
+        self.addminperiod(self.params.period + 1)
+
+    def compute(self):
+        return (atr(line_values(self.data.high), line_values(self.data.low),
+                    line_values(self.data.close), int(self.params.period)),)
@@ -10,8 +10,12 @@ and sells when the price rises by 20% from the purchase price.
 import backtrader as bt
 import datetime
 import os.path
+import numpy as np
 import pandas as pd
 
+from utils.signals import drop_signals
+from strategy_runner import run_strategy_backtest
+
 
 class ReboundStrategy(bt.Strategy):
     """
@@ -33,8 +37,13 @@ class ReboundStrategy(bt.Strategy):
         # To keep track of pending orders
         self.order = None
         
-        # Set the sizer to use all available cash (100%)
-        self.sizer = bt.sizers.PercentSizer(percents=100)
+    def start(self):
+        """Precompute the buy signal over the preloaded data"""
+        close = np.frombuffer(self.data.close.array, dtype=np.float64)
+        
+        # True where the close has dropped by the threshold over the lookback period
+        self.drop_signal_array = drop_signals(close, self.params.drop_threshold,
+                                              self.params.lookback_period)
         
     def log(self, txt, dt=None):
         """Logging function for this strategy"""
@@ -73,27 +82,23 @@ class ReboundStrategy(bt.Strategy):
         
         # Check if we are in the market
         if not self.position:
-            # Not in the market, look for buy signal
-            
-            # Check if we have enough data for lookback
-            if len(self.data) > self.params.lookback_period:
-                # Price from lookback_period days ago
+            # Not in the market, look for this bar's precomputed buy signal
+            # (False until there is enough data for the lookback)
+            if self.drop_signal_array[len(self.data) - 1]:
+                # Price from lookback_period days ago, for the log
                 past_price = self.data.close[-self.params.lookback_period]
-                
-                # Calculate the price drop percentage
                 price_drop = (past_price - current_price) / past_price
                 
-                # If price has dropped by threshold or more, buy
-                if price_drop >= self.params.drop_threshold:
-                    cash = self.broker.getcash()
-                    size = int(cash / current_price) # Calculate how many shares we can buy
-                    value = size * current_price
-                    
-                    self.log(f'BUY CREATE, {current_price:.2f} (Price dropped by {price_drop:.2%} from {past_price:.2f})')
-                    self.log(f'Using {value:.2f} of {cash:.2f} available cash to buy {size} shares')
-                    
-                    # Keep track of the created order to avoid a 2nd order
-                    self.order = self.buy(size=size)
+                # The price has dropped by the threshold or more, so buy
+                cash = self.broker.getcash()
+                size = int(cash / current_price) # Calculate how many shares we can buy
+                value = size * current_price
+                
+                self.log(f'BUY CREATE, {current_price:.2f} (Price dropped by {price_drop:.2%} from {past_price:.2f})')
+                self.log(f'Using {value:.2f} of {cash:.2f} available cash to buy {size} shares')
+                
+                # Keep track of the created order to avoid a 2nd order
+                self.order = self.buy(size=size)
         else:
             # Already in the market, look for sell signal
             
@@ -114,80 +119,49 @@ class ReboundStrategy(bt.Strategy):
 
 
 def run_backtest(data_file, start_cash=10000.0, commission=0.001, 
-                drop_threshold=0.10, rise_threshold=0.20, lookback_period=5):
-    """Run the backtest with the given parameters"""
-    # Create a cerebro entity
-    cerebro = bt.Cerebro()
+                drop_threshold=0.10, rise_threshold=0.20, lookback_period=5,
+                output_file=None, plot=True):
+    """
+    Run the backtest with the given parameters through the shared strategy runner
 
-    # Add the Rebound Strategy
-    cerebro.addstrategy(ReboundStrategy, 
-                       drop_threshold=drop_threshold,
-                       rise_threshold=rise_threshold,
-                       lookback_period=lookback_period)
+    Without a plot there is nothing Backtrader is needed for, so the compiled
+    kernel from rebound_backtest_numba runs the strategy instead of cerebro.
+    """
+    if not plot:
+        # Imported here so Backtrader runs never compile the kernel
+        from rebound_backtest_numba import run_backtest as run_numba_backtest
+        return run_numba_backtest(
+            data_file, output_file=output_file, drop_threshold=drop_threshold,
+            rise_threshold=rise_threshold, lookback_period=lookback_period,
+            start_cash=start_cash, commission=commission)
     
-    # Set the default sizer to use 100% of available cash
-    cerebro.addsizer(bt.sizers.PercentSizer, percents=100)
-
-    # Load the data
-    data = bt.feeds.GenericCSVData(
-        dataname=data_file,
-        dtformat='%Y-%m-%d',
-        datetime=0,
-        open=1,
-        high=2,
-        low=3,
-        close=4,
-        volume=5,
-        openinterest=6
+    return run_strategy_backtest(
+        strategy_class=ReboundStrategy,
+        data_file=data_file,
+        output_file=output_file,
+        start_cash=start_cash,
+        commission=commission,
+        plot=plot,
+        strategy_params={
+            'drop_threshold': drop_threshold,
+            'rise_threshold': rise_threshold,
+            'lookback_period': lookback_period
+        }
     )
 
-    # Add the Data Feed to Cerebro
-    cerebro.adddata(data)
-
-    # Set our desired cash start
-    cerebro.broker.setcash(start_cash)
-
-    # Set the commission
-    cerebro.broker.setcommission(commission=commission)
-
-    # Add analyzers
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-
-    # Print out the starting conditions
-    print(f'Starting Portfolio Value: {cerebro.broker.getvalue():.2f}')
-
-    # Run the backtest
-    results = cerebro.run()
-    
-    # Print out the final result
-    print(f'Final Portfolio Value: {cerebro.broker.getvalue():.2f}')
-    
-    # Print analyzer results
-    strategy = results[0]
-    print(f"Sharpe Ratio: {strategy.analyzers.sharpe.get_analysis()['sharperatio']:.3f}")
-    print(f"Max Drawdown: {strategy.analyzers.drawdown.get_analysis()['max']['drawdown']:.2f}%")
-    print(f"Total Return: {strategy.analyzers.returns.get_analysis()['rtot']:.2f}%")
-    
-    # Plot the result
-    cerebro.plot(style='candlestick', barup='green', bardown='red')
-    
-    return True
-
 
 if __name__ == '__main__':
     import argparse
     import sys
-    from data_handler import download_spy_data, check_and_fix_csv
+    from data_handler import check_and_fix_csv, download_spy_data
     
     parser = argparse.ArgumentParser(description='Run Rebound Strategy Backtest')
     parser.add_argument('--data', type=str, default='spy_data.csv', help='Data file to use')
     parser.add_argument('--output', type=str, default='rebound_results.csv', help='Output file for results')
     parser.add_argument('--cash', type=float, default=10000.0, help='Starting cash')
     parser.add_argument('--commission', type=float, default=0.001, help='Commission rate')
-    parser.add_argument('--drop', type=float, default=0.10, help='Drop threshold (e.g., 0.10 for 10%)')
-    parser.add_argument('--rise', type=float, default=0.20, help='Rise threshold (e.g., 0.20 for 20%)')
+    parser.add_argument('--drop', type=float, default=0.10, help='Drop threshold (e.g., 0.10 for 10%%)')
+    parser.add_argument('--rise', type=float, default=0.20, help='Rise threshold (e.g., 0.20 for 20%%)')
     parser.add_argument('--lookback', type=int, default=5, help='Lookback period in days')
     parser.add_argument('--no-plot', action='store_true', help='Disable plotting')
     parser.add_argument('--download', action='store_true', help='Download fresh data')
@@ -223,7 +197,9 @@ if __name__ == '__main__':
         commission=args.commission,
         drop_threshold=args.drop,
         rise_threshold=args.rise,
-        lookback_period=args.lookback
+        lookback_period=args.lookback,
+        output_file=args.output,
+        plot=not args.no_plot
     )
     
     if success:
@@ -13,10 +13,14 @@ import sys
 
 import backtrader as bt
 import backtrader.feeds as btfeeds
+import numpy as np
 import pandas as pd
 
 # Import from data_handler instead
-from data_handler import download_spy_data
+from data_handler import check_and_fix_csv, download_spy_data, load_price_frame
+from strategy_runner import run_strategy_backtest_with_df
+from utils.metrics import compute_metrics, print_summary, trade_stats
+from vector_backtest import crossover_signals
 
 
 class SmaCrossStrategy(bt.Strategy):
@@ -29,20 +33,17 @@ class SmaCrossStrategy(bt.Strategy):
     )
 
     def __init__(self):
-        # Initialize moving averages
-        self.fast_sma = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.params.fast_period)
-        self.slow_sma = bt.indicators.SimpleMovingAverage(
-            self.data.close, period=self.params.slow_period)
-        
-        # Create a CrossOver Signal
-        self.crossover = bt.indicators.CrossOver(self.fast_sma, self.slow_sma)
-        
         # To keep track of pending orders
         self.order = None
         
-        # Set the sizer to use all available cash (100%)
-        self.sizer = bt.sizers.PercentSizer(percents=100)
+    def start(self):
+        """Precompute both SMAs and the crossover signal over the preloaded data"""
+        close = pd.Series(np.frombuffer(self.data.close.array, dtype=np.float64))
+        self.fast_sma_array = close.rolling(self.params.fast_period).mean().to_numpy()
+        self.slow_sma_array = close.rolling(self.params.slow_period).mean().to_numpy()
+        
+        # +1 where the fast SMA crosses above the slow SMA, -1 where it crosses below
+        self.crossover_array = crossover_signals(self.fast_sma_array, self.slow_sma_array)
         
     def log(self, txt, dt=None):
         """Logging function for this strategy"""
@@ -72,10 +73,13 @@ class SmaCrossStrategy(bt.Strategy):
         if self.order:
             return
 
+        # Look up this bar's precomputed crossover signal
+        crossover = self.crossover_array[len(self.data) - 1]
+
         # Check if we are in the market
         if not self.position:
             # Not in the market, look for buy signal
-            if self.crossover > 0:  # Fast SMA crosses above slow SMA
+            if crossover > 0:  # Fast SMA crosses above slow SMA
                 cash = self.broker.getcash()
                 size = int(cash / self.data.close[0])  # Calculate how many shares we can buy
                 value = size * self.data.close[0]
@@ -87,7 +91,7 @@ class SmaCrossStrategy(bt.Strategy):
                 self.order = self.buy(size=size)
         else:
             # Already in the market, look for sell signal
-            if self.crossover < 0:  # Fast SMA crosses below slow SMA
+            if crossover < 0:  # Fast SMA crosses below slow SMA
                 size = self.position.size
                 value = size * self.data.close[0]
                 
@@ -98,55 +102,76 @@ class SmaCrossStrategy(bt.Strategy):
                 self.order = self.close()
 
 
-def run_backtest(data_file, start_cash=10000.0, commission=0.001):
-    """Run the backtest with the given parameters"""
-    # Create a cerebro entity
-    cerebro = bt.Cerebro()
-
-    # Add a strategy
-    cerebro.addstrategy(SmaCrossStrategy)
-
-    # Load the data
-    data = bt.feeds.YahooFinanceCSVData(
-        dataname=data_file,
-        # Do not pass values before this date
-        fromdate=datetime.datetime(1993, 1, 1),
-        # Do not pass values after this date
-        todate=datetime.datetime(2023, 12, 31),
-        reverse=False)
-
-    # Add the Data Feed to Cerebro
-    cerebro.adddata(data)
+def load_backtest_frame(data_file):
+    """Load the price data restricted to the backtest date range"""
+    # Check and fix the CSV file format before loading it
+    if not check_and_fix_csv(data_file):
+        return None
+    df = load_price_frame(data_file)
+    if df is None:
+        return None
+    df = df.loc['1993-01-01':'2023-12-31']
+    if df.empty:
+        print(f"Error: No data in {data_file} for the backtest period")
+        return None
+    return df
 
-    # Set our desired cash start
-    cerebro.broker.setcash(start_cash)
 
-    # Set the commission
-    cerebro.broker.setcommission(commission=commission)
+def run_backtest(data_file, start_cash=10000.0, commission=0.001, plot=True):
+    """
+    Run the backtest with the given parameters
 
-    # Add analyzers
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+    Without a plot there is nothing Backtrader is needed for, so the compiled
+    kernel from sma_backtest_numba (or, without numba, the NumPy simulation
+    from vector_backtest) runs the strategy instead of cerebro.
+    """
+    if not plot:
+        return run_kernel_backtest(data_file, start_cash, commission)
+
+    # Run Backtrader through the shared strategy runner
+    df = load_backtest_frame(data_file)
+    if df is None:
+        return False
+    return run_strategy_backtest_with_df(SmaCrossStrategy, df, output_file=None,
+                                         start_cash=start_cash,
+                                         commission=commission, plot=plot)
+
+
+def run_kernel_backtest(data_file, start_cash=10000.0, commission=0.001):
+    """Run the strategy with the compiled kernel and print the same summary"""
+    # Imported here so Backtrader runs never compile the kernel
+    from sma_backtest_numba import compiled_simulate, simulate
+    from utils._njit import NUMBA_AVAILABLE
+
+    # Without numba (or the AOT build) the kernel is a plain Python loop, so
+    # use the NumPy-vectorized simulation instead
+    if compiled_simulate is simulate and not NUMBA_AVAILABLE:
+        from vector_backtest import simulate as compiled_simulate
+
+    # Load the data over the same date range as the Backtrader run
+    df = load_backtest_frame(data_file)
+    if df is None:
+        return False
 
     # Print out the starting conditions
-    print(f'Starting Portfolio Value: {cerebro.broker.getvalue():.2f}')
+    print(f'Starting Portfolio Value: {start_cash:.2f}')
+
+    # Run the backtest with the strategy's default periods
+    open_ = np.require(df['open'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+    close = np.require(df['close'].to_numpy(dtype=np.float64), requirements=['C', 'W'])
+    position, _, portfolio_value, _, _ = compiled_simulate(
+        open_, close, int(SmaCrossStrategy.params.fast_period),
+        int(SmaCrossStrategy.params.slow_period),
+        float(start_cash), float(commission))
 
-    # Run the backtest
-    results = cerebro.run()
-    
     # Print out the final result
-    print(f'Final Portfolio Value: {cerebro.broker.getvalue():.2f}')
-    
-    # Print analyzer results
-    strategy = results[0]
-    print(f"Sharpe Ratio: {strategy.analyzers.sharpe.get_analysis()['sharperatio']:.3f}")
-    print(f"Max Drawdown: {strategy.analyzers.drawdown.get_analysis()['max']['drawdown']:.2f}%")
-    print(f"Total Return: {strategy.analyzers.returns.get_analysis()['rtot']:.2f}%")
-    
-    # Plot the result
-    cerebro.plot(style='candlestick', barup='green', bardown='red')
+    print(f'Final Portfolio Value: {portfolio_value[-1]:.2f}')
 
+    # Summarize the run in the same format as the Backtrader engine
+    metrics = {'final_value': float(portfolio_value[-1]), **compute_metrics(portfolio_value),
+               **trade_stats(position, open_, commission)}
+    print_summary(metrics)
+    return metrics
 
 if __name__ == '__main__':
     # Define date range (30 years)
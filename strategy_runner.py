@@ -6,96 +6,276 @@ Base Strategy Runner Module
 Contains common functionality for running different trading strategies
 """
 
+import csv
 import datetime
+import itertools
+import json
+import math
+import multiprocessing
 import os.path
+import numpy as np
 import pandas as pd
 import argparse
 import sys
 
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
 import backtrader as bt
-from data_handler import download_spy_data, check_and_fix_csv
+from data_handler import check_and_fix_csv, load_price_frame
+from utils.metrics import compute_metrics, print_summary
+from utils.results import RESULT_FORMATS, save_results_frame
+
+# Rows CSVWriter buffers before streaming them to a CSV file
+FLUSH_ROWS = 8192
+
+# Backtrader date number of 1970-01-01 (days since 0001-01-01, counting from 1)
+EPOCH_DATE_NUMBER = datetime.date(1970, 1, 1).toordinal()
+
+
+def _csv_cells(column):
+    """
+    Convert a NumPy column to the values written to CSV
+    
+    Values are formatted like DataFrame.to_csv: dates as YYYY-MM-DD and NaN
+    as an empty field.
+    """
+    if column.dtype.kind == 'M':
+        return column.astype('datetime64[D]').astype(str).tolist()
+    if column.dtype.kind == 'f' and np.isnan(column).any():
+        cells = column.astype(object)
+        cells[np.isnan(column)] = ''
+        return cells.tolist()
+    return column.tolist()
+
+
+def _line_values(line, start, stop):
+    """Return bars start..stop-1 of a Backtrader line buffer as a NumPy array"""
+    return np.array(line.array[start:stop], dtype=np.float64)
+
+
+def _line_dates(line, start, stop):
+    """Return the dates of bars start..stop-1 of a Backtrader datetime line"""
+    days = _line_values(line, start, stop).astype(np.int64) - EPOCH_DATE_NUMBER
+    return days.astype('datetime64[D]')
+
+
+def _position_cells(position):
+    """Convert position sizes to CSV values, writing whole sizes as integers"""
+    if np.array_equal(position, np.floor(position)):
+        return position.astype(np.int64).tolist()
+    return [int(size) if size.is_integer() else size for size in position.tolist()]
 
 
 class CSVWriter(bt.Analyzer):
-    """Analyzer to save trade data to CSV"""
+    """
+    Analyzer to save trade data to CSV
+    
+    CSV rows are streamed to the file every FLUSH_ROWS bars, so only one
+    chunk of them is held in memory; a filename ending in .parquet or
+    .feather is written in that format at the end instead. Dates and closes are sliced from the data
+    feed's line buffers when rows are written rather than read bar by bar.
+    Also computes the summary metrics from
+    the recorded portfolio value, available through get_analysis(). Set
+    filename to None to only compute the metrics.
+    
+    Columns that follow from the recorded ones are better given as
+    derived_fields: each function gets a dict of the recorded columns
+    ('Close' and every extra field) as arrays and returns its column in one
+    call per chunk, instead of a getter call per bar.
+    """
     
     params = (
         ('filename', 'strategy_results.csv'),
         ('extra_fields', []),  # List of tuples (field_name, getter_function)
+        ('derived_fields', []),  # List of tuples (field_name, column_function)
     )
     
     def start(self):
-        self.results = []
+        # Resolve the objects read on every bar once
+        self._data = self.strategy.datas[0]
+        self._broker = self.strategy.broker
         
-    def next(self):
-        # Get current portfolio value
-        portfolio_value = self.strategy.broker.getvalue()
+        # The portfolio value is kept for the whole run for the metrics
+        n = max(self._data.buflen(), 1)
+        self._n = 0
+        self._portfolio_value = np.empty(n, dtype=np.float64)
+        
+        # Preallocate one typed column per field: one chunk when streaming
+        # to CSV, otherwise sized to the preloaded data
+        self._stream = bool(self.p.filename) and not self.p.filename.endswith(('.parquet', '.feather'))
+        size = min(n, FLUSH_ROWS) if self._stream else n
+        self._i = 0
+        self._position = np.empty(size, dtype=np.float64)
+        self._cash = np.empty(size, dtype=np.float64)
+        self._extra = [np.empty(size, dtype=np.float64) for _ in self.p.extra_fields]
         
-        # Get current position
-        position = self.strategy.position.size if self.strategy.position else 0
+        # Open the CSV file and write its header
+        if self._stream:
+            self._file = open(self.p.filename, 'w', newline='')
+            self._writer = csv.writer(self._file, lineterminator=os.linesep)
+            self._writer.writerow(['Date', 'Close', 'Position', 'Cash', 'PortfolioValue'] +
+                                  [field_name for field_name, getter_func in self.p.extra_fields] +
+                                  [field_name for field_name, column_func in self.p.derived_fields])
+    
+    def _grow(self):
+        """Double the column capacity when the data was not preloaded"""
+        n = 2 * len(self._position)
+        self._position = np.resize(self._position, n)
+        self._cash = np.resize(self._cash, n)
+        self._extra = [np.resize(column, n) for column in self._extra]
+    
+    def _derived(self, close, extra):
+        """Compute the derived field columns from the recorded columns"""
+        if not self.p.derived_fields:
+            return []
+        recorded = {'Close': close}
+        for column, (field_name, getter_func) in zip(extra, self.p.extra_fields):
+            recorded[field_name] = column
+        return [column_func(recorded) for field_name, column_func in self.p.derived_fields]
+    
+    def _flush(self):
+        """Write the buffered rows to the CSV file and empty the buffer"""
+        i = self._i
+        start = self._n - i
+        close = _line_values(self._data.close, start, self._n)
+        extra = [column[:i] for column in self._extra]
+        columns = [
+            _csv_cells(_line_dates(self._data.datetime, start, self._n)),
+            _csv_cells(close),
+            _position_cells(self._position[:i]),
+            _csv_cells(self._cash[:i]),
+            _csv_cells(self._portfolio_value[start:self._n])
+        ]
+        columns += [_csv_cells(column) for column in extra]
+        columns += [_csv_cells(column) for column in self._derived(close, extra)]
+        self._writer.writerows(zip(*columns))
+        self._i = 0
         
-        # Get current date
-        date = self.strategy.datas[0].datetime.date(0)
+    def next(self):
+        i = self._i
+        if i == len(self._position):
+            if self._stream:
+                self._flush()
+                i = 0
+            else:
+                self._grow()
+        n = self._n
+        if n == len(self._portfolio_value):
+            self._portfolio_value = np.resize(self._portfolio_value, 2 * n)
         
-        # Get current prices
-        close = self.strategy.datas[0].close[0]
+        broker = self._broker
         
-        # Get cash
-        cash = self.strategy.broker.getcash()
+        # Get current position (size is 0 when flat)
+        self._position[i] = broker.getposition(self._data).size
         
-        # Create base result dict
-        result = {
-            'Date': date.isoformat(),
-            'Close': close,
-            'Position': position,
-            'Cash': cash,
-            'PortfolioValue': portfolio_value
-        }
+        # Get cash and current portfolio value
+        self._cash[i] = broker.getcash()
+        self._portfolio_value[n] = broker.getvalue()
         
         # Add extra fields if specified
-        for field_name, getter_func in self.p.extra_fields:
+        strategy = self.strategy
+        for column, (field_name, getter_func) in zip(self._extra, self.p.extra_fields):
             try:
-                result[field_name] = getter_func(self.strategy)
+                column[i] = getter_func(strategy)
             except Exception:
-                result[field_name] = float('nan')
+                column[i] = float('nan')
         
-        # Store the results
-        self.results.append(result)
+        self._i = i + 1
+        self._n = n + 1
     
     def stop(self):
-        # Convert results to DataFrame and save to CSV
-        results_df = pd.DataFrame(self.results)
-        results_df.to_csv(self.p.filename, index=False)
-        print(f"Results saved to {self.p.filename}")
+        # Compute the summary metrics from the portfolio value
+        n = self._n
+        self.rets.update(compute_metrics(self._portfolio_value[:n]))
+        
+        # Write the last CSV chunk
+        if self._stream:
+            self._flush()
+            self._file.close()
+            print(f"Results saved to {self.p.filename}")
+            return
+        
+        # Save results as Parquet or Feather (binary columns)
+        if self.p.filename:
+            position = self._position[:n]
+            if np.array_equal(position, np.floor(position)):
+                position = position.astype(np.int64)
+            
+            close = _line_values(self._data.close, 0, n)
+            extra = [column[:n] for column in self._extra]
+            results = {
+                'Date': _line_dates(self._data.datetime, 0, n),
+                'Close': close,
+                'Position': position,
+                'Cash': self._cash[:n],
+                'PortfolioValue': self._portfolio_value[:n]
+            }
+            for column, (field_name, getter_func) in zip(extra, self.p.extra_fields):
+                results[field_name] = column
+            for column, (field_name, column_func) in zip(self._derived(close, extra),
+                                                         self.p.derived_fields):
+                results[field_name] = column
+            
+            # Wrap the column buffers without copying them
+            results_df = pd.DataFrame(results, copy=False)
+            save_results_frame(results_df, self.p.filename)
+            print(f"Results saved to {self.p.filename}")
 
 
 def run_strategy_backtest(strategy_class, data_file, output_file='strategy_results.csv', 
                          start_cash=10000.0, commission=0.001, plot=True,
-                         strategy_params=None, extra_analyzers=None, csv_fields=None):
+                         strategy_params=None, extra_analyzers=None, csv_fields=None,
+                         csv_derived_fields=None):
     """
     Run a strategy backtest and save results to CSV
     
     Parameters:
     - strategy_class: The strategy class to backtest
     - data_file: Path to the data file
-    - output_file: Path to save results
+    - output_file: Path to save results (None to skip saving them)
     - start_cash: Initial cash amount
     - commission: Commission rate
     - plot: Whether to plot results
     - strategy_params: Dict of strategy-specific parameters
     - extra_analyzers: Dict of additional analyzers to add
     - csv_fields: List of tuples (field_name, getter_function) for additional CSV fields
+    - csv_derived_fields: List of tuples (field_name, column_function) for CSV fields
+      computed from the recorded columns (see CSVWriter)
+    
+    Returns a dict of summary metrics on success, False otherwise
     """
-    # Check if the data file exists
-    if not os.path.exists(data_file):
-        print(f"Error: Data file {data_file} does not exist")
+    # Check (and repair) the data file; unchanged files passed before are
+    # skipped through their .ok sidecar
+    if not check_and_fix_csv(data_file):
         return False
     
-    # Check and fix CSV file format if needed
-    if not check_and_fix_csv(data_file):
-        print(f"Error: Could not validate or fix data file {data_file}")
+    # Load the data once, in memory
+    print(f"Loading data from {data_file}...")
+    df = load_price_frame(data_file)
+    if df is None:
+        print(f"Error: Could not load data file {data_file}")
         return False
     
+    return run_strategy_backtest_with_df(strategy_class, df, output_file=output_file,
+                                         start_cash=start_cash, commission=commission,
+                                         plot=plot, strategy_params=strategy_params,
+                                         extra_analyzers=extra_analyzers,
+                                         csv_fields=csv_fields,
+                                         csv_derived_fields=csv_derived_fields)
+
+
+def run_strategy_backtest_with_df(strategy_class, df, output_file='strategy_results.csv',
+                                  start_cash=10000.0, commission=0.001, plot=True,
+                                  strategy_params=None, extra_analyzers=None, csv_fields=None,
+                                  csv_derived_fields=None):
+    """
+    Run a strategy backtest on an already loaded price DataFrame
+    
+    Takes the frame returned by load_price_frame instead of a data file, so
+    repeated runs (e.g. parameter sweeps) parse the data only once. The other
+    parameters and the return value are those of run_strategy_backtest.
+    """
     try:
         # Create a Backtrader cerebro instance
         cerebro = bt.Cerebro()
@@ -106,19 +286,8 @@ def run_strategy_backtest(strategy_class, data_file, output_file='strategy_resul
         else:
             cerebro.addstrategy(strategy_class)
         
-        # Load the data
-        print(f"Loading data from {data_file}...")
-        data = bt.feeds.GenericCSVData(
-            dataname=data_file,
-            dtformat='%Y-%m-%d',
-            datetime=0,
-            open=1,
-            high=2,
-            low=3,
-            close=4,
-            volume=5,
-            openinterest=6
-        )
+        # Feed the preloaded DataFrame to Backtrader
+        data = bt.feeds.PandasData(dataname=df)
         cerebro.adddata(data)
         
         # Set the cash
@@ -127,16 +296,15 @@ def run_strategy_backtest(strategy_class, data_file, output_file='strategy_resul
         # Set the commission
         cerebro.broker.setcommission(commission=commission)
         
-        # Add default analyzers
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+        # Add the trade analyzer
         cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
         
-        # Add CSV writer with extra fields if provided
+        # Add CSV writer (which also computes the summary metrics) with extra
+        # fields if provided
         cerebro.addanalyzer(CSVWriter, _name='csvwriter', 
                            filename=output_file,
-                           extra_fields=csv_fields or [])
+                           extra_fields=csv_fields or [],
+                           derived_fields=csv_derived_fields or [])
         
         # Add extra analyzers if provided
         if extra_analyzers:
@@ -153,48 +321,197 @@ def run_strategy_backtest(strategy_class, data_file, output_file='strategy_resul
         # Print out the final result
         print(f'Final Portfolio Value: {cerebro.broker.getvalue():.2f}')
         
-        # Print analyzer results
+        # Collect the summary metrics for the caller
         strategy = results[0]
-        sharpe_ratio = strategy.analyzers.sharpe.get_analysis().get('sharperatio', 0.0)
-        max_drawdown = strategy.analyzers.drawdown.get_analysis().get('max', {}).get('drawdown', 0.0)
-        total_return = strategy.analyzers.returns.get_analysis().get('rtot', 0.0)
-        
-        print(f"Sharpe Ratio: {sharpe_ratio:.3f}")
-        print(f"Max Drawdown: {max_drawdown:.2f}%")
-        print(f"Total Return: {total_return:.2f}%")
+        performance = strategy.analyzers.csvwriter.get_analysis()
+        metrics = {
+            'final_value': cerebro.broker.getvalue(),
+            'sharpe_ratio': performance['sharpe_ratio'],
+            'max_drawdown': performance['max_drawdown'],
+            'total_return': performance['total_return']
+        }
         
-        # Print trade statistics
+        # Add the trade statistics
         trade_analysis = strategy.analyzers.trades.get_analysis()
-        try:
-            # Extract values safely from the AutoOrderedDict
-            total_trades = trade_analysis.total.total if hasattr(trade_analysis, 'total') and hasattr(trade_analysis.total, 'total') else 0
-            won_trades = trade_analysis.won.total if hasattr(trade_analysis, 'won') and hasattr(trade_analysis.won, 'total') else 0
-            
-            print(f"Total Trades: {total_trades}")
-            if total_trades > 0:
-                win_rate = (won_trades / total_trades * 100)
-                print(f"Win Rate: {win_rate:.2f}% ({won_trades}/{total_trades})")
-        except Exception as e:
-            print(f"Could not calculate trade statistics: {e}")
-            print("Trade analysis data:", trade_analysis)
+        # Missing sections (e.g. no closed trades) count as zero; dict.get
+        # does not create them the way AutoOrderedDict attribute access does
+        metrics['total_trades'] = trade_analysis.get('total', {}).get('total', 0)
+        metrics['won_trades'] = trade_analysis.get('won', {}).get('total', 0)
+        
+        # Print analyzer results
+        print_summary(metrics)
         
         # Plot the result if requested
         if plot:
             cerebro.plot(style='candlestick', barup='green', bardown='red')
         
-        print(f"Backtest results saved to {output_file}")
-        return True
+        if output_file:
+            print(f"Backtest results saved to {output_file}")
+        return metrics
         
     except Exception as e:
         print(f"Error running backtest: {e}")
         return False
 
 
-def parse_common_args():
-    """Parse common command line arguments for strategy runners"""
-    parser = argparse.ArgumentParser(description='Run Strategy Backtest')
+def load_param_grid(config_file):
+    """
+    Load a parameter grid from a JSON file
+    
+    The file maps strategy parameter names to a list of values to try (a
+    single value is swept as a one-item list), e.g.
+    {"drop_threshold": [0.05, 0.10], "lookback_period": [5, 10]}.
+    Returns the grid as a dict, or None if the file cannot be used.
+    """
+    try:
+        with open(config_file) as f:
+            grid = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading sweep config {config_file}: {e}")
+        return None
+    
+    if not isinstance(grid, dict) or not grid:
+        print(f"Error: Sweep config {config_file} must map parameter names to values")
+        return None
+    return {name: values if isinstance(values, list) else [values]
+            for name, values in grid.items()}
+
+
+# Price data of a grid sweep worker, a view of the parent's shared memory
+_sweep_df = None
+_sweep_shm = None
+
+
+def _share_price_frame(df):
+    """
+    Copy a price frame's dates and values into shared memory blocks
+    
+    Returns the blocks (closed and unlinked by the caller) and the spec
+    _init_sweep_worker rebuilds the frame from.
+    """
+    dates = df.index.values
+    values = np.ascontiguousarray(df.to_numpy(dtype=np.float64))
+    blocks = (SharedMemory(create=True, size=max(dates.nbytes, 1)),
+              SharedMemory(create=True, size=max(values.nbytes, 1)))
+    np.ndarray(dates.shape, dates.dtype, buffer=blocks[0].buf)[:] = dates
+    np.ndarray(values.shape, values.dtype, buffer=blocks[1].buf)[:] = values
+    spec = (blocks[0].name, blocks[1].name, dates.dtype.str, values.shape, list(df.columns))
+    return blocks, spec
+
+
+def _init_sweep_worker(spec):
+    """Attach a grid sweep worker to the price data shared by the parent process"""
+    global _sweep_df, _sweep_shm
+    dates_name, values_name, dates_dtype, shape, columns = spec
+    _sweep_shm = (SharedMemory(name=dates_name), SharedMemory(name=values_name))
+    dates = np.ndarray(shape[:1], np.dtype(dates_dtype), buffer=_sweep_shm[0].buf)
+    values = np.ndarray(shape, np.float64, buffer=_sweep_shm[1].buf)
+    # Backtrader stores every line as a float, so one float block is enough
+    _sweep_df = pd.DataFrame(values, index=pd.DatetimeIndex(dates), columns=columns, copy=False)
+
+
+def _run_sweep_combination(strategy_class, strategy_params, start_cash, commission):
+    """Backtest one grid sweep combination on the worker's price data"""
+    if _sweep_df is None:
+        return None
+    return run_strategy_backtest_with_df(strategy_class, _sweep_df, output_file=None,
+                                         start_cash=start_cash, commission=commission,
+                                         plot=False, strategy_params=strategy_params)
+
+
+def run_grid_sweep(strategy_class, data_file, param_grid, sweep_output='sweep_results.csv',
+                   start_cash=10000.0, commission=0.001, workers=1, base_params=None):
+    """
+    Backtest every combination of a parameter grid
+    
+    The data is loaded once and fed to a fresh Cerebro for each combination.
+    With more than one worker the combinations are spread over a process
+    pool whose workers read the prices from shared memory, so the data file
+    is parsed only once. The parameters and summary metrics of every run are
+    saved to a single CSV.
+    
+    Parameters:
+    - strategy_class: The strategy class to backtest
+    - data_file: Path to the data file
+    - param_grid: Dict of strategy parameter name -> list of values
+    - sweep_output: Path to save the sweep summary
+    - start_cash: Initial cash amount
+    - commission: Commission rate
+    - workers: Number of worker processes (1 runs the sweep in this process)
+    - base_params: Strategy parameters shared by every run, not saved to the CSV
+    """
+    names = list(param_grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+    run_params = [{**(base_params or {}), **params} for params in combinations]
+    
+    # Check (and repair) the data file and load it once for all runs
+    if not check_and_fix_csv(data_file):
+        return False
+    print(f"Loading data from {data_file}...")
+    df = load_price_frame(data_file)
+    if df is None:
+        print(f"Error: Could not load data file {data_file}")
+        return False
+    
+    if workers > 1:
+        # Backtests are independent, so spread them over the workers; they
+        # all read the prices from one shared copy instead of the data file
+        mp_context = multiprocessing.get_context('spawn') if sys.platform in ('darwin', 'win32') else None
+        
+        # Send each worker one batch of runs, unless there are too few runs
+        # to even out the batches' run times
+        chunksize = 1
+        if len(combinations) >= 2 * workers:
+            chunksize = math.ceil(len(combinations) / workers)
+        print(f"Sweeping {len(combinations)} parameter combinations with {workers} workers...")
+        blocks, spec = _share_price_frame(df)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                     initializer=_init_sweep_worker, initargs=(spec,)) as ex:
+                results = list(ex.map(_run_sweep_combination,
+                                      [strategy_class] * len(combinations), run_params,
+                                      [start_cash] * len(combinations),
+                                      [commission] * len(combinations),
+                                      chunksize=chunksize))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    else:
+        print(f"Sweeping {len(combinations)} parameter combinations...")
+        results = [run_strategy_backtest_with_df(strategy_class, df, output_file=None,
+                                                 start_cash=start_cash, commission=commission,
+                                                 plot=False, strategy_params=strategy_params)
+                   for strategy_params in run_params]
+    
+    rows = []
+    for strategy_params, metrics in zip(combinations, results):
+        if not metrics:
+            print(f"Backtest failed for {strategy_params}")
+            continue
+        rows.append({**strategy_params, **metrics})
+    
+    if not rows:
+        print("Error: All sweep backtests failed")
+        return False
+    
+    pd.DataFrame(rows).to_csv(sweep_output, index=False)
+    print(f"Sweep results saved to {sweep_output}")
+    return True
+
+
+def parse_common_args(add_help=True):
+    """
+    Parse common command line arguments for strategy runners
+    
+    Pass add_help=False to use the parser as a parent of another parser
+    (e.g. the strategy subcommands of run_backtest.py).
+    """
+    parser = argparse.ArgumentParser(description='Run Strategy Backtest', add_help=add_help)
     parser.add_argument('--data', type=str, default='spy_data.csv', help='Data file to use')
     parser.add_argument('--output', type=str, default='strategy_results.csv', help='Output file for results')
+    parser.add_argument('--format', type=str, default=None, choices=RESULT_FORMATS,
+                        help='Results file format, replacing the extension of --output')
     parser.add_argument('--cash', type=float, default=10000.0, help='Starting cash')
     parser.add_argument('--commission', type=float, default=0.001, help='Commission rate')
     parser.add_argument('--no-plot', action='store_true', help='Disable plotting')
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the download cache in data_handler.download_spy_data
+Run from the repository root with: python -m unittest discover -s tests -t .
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import data_handler
+
+
+def fake_prices(start_date, end_date):
+    """Return one bar per weekday in [start_date, end_date), like _fetch_spy_data"""
+    dates = pd.bdate_range(start_date, pd.Timestamp(end_date) - pd.Timedelta(days=1))
+    return pd.DataFrame({
+        'Date': dates,
+        'Open': 100.0, 'High': 101.0, 'Low': 99.0, 'Close': 100.5,
+        'Adj Close': 100.5, 'Volume': 1000000, 'OpenInterest': 0
+    })
+
+
+def empty_prices(start_date, end_date):
+    """Return what yfinance returns on a failed or throttled download"""
+    return pd.DataFrame()
+
+
+class DownloadCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.data_file = os.path.join(self.tmp_dir, 'spy_data.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def download(self, end_date, fetch=fake_prices):
+        """Call download_spy_data with a mocked fetch, returning the fetch calls"""
+        with mock.patch.object(data_handler, '_fetch_spy_data', side_effect=fetch) as fetched:
+            self.assertEqual(data_handler.download_spy_data('2009-01-01', end_date, self.data_file),
+                             self.data_file)
+        return fetched.call_args_list
+
+    def last_date(self):
+        return pd.read_csv(self.data_file)['Date'].iloc[-1]
+
+    def test_short_cache_fetches_tail(self):
+        self.download('2009-07-01')
+        calls = self.download('2010-01-01')
+        self.assertEqual(calls, [mock.call('2009-07-01', '2010-01-01')])
+        self.assertEqual(self.last_date(), '2009-12-31')
+
+    def test_empty_tail_is_fetched_again(self):
+        self.download('2009-07-01')
+
+        # A failed tail download keeps the data it had...
+        calls = self.download('2010-01-01', fetch=empty_prices)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.last_date(), '2009-06-30')
+
+        # ...and does not mark the cache as reaching end_date
+        calls = self.download('2010-01-01')
+        self.assertEqual(calls, [mock.call('2009-07-01', '2010-01-01')])
+        self.assertEqual(self.last_date(), '2009-12-31')
+
+    def test_weekend_end_is_a_hit(self):
+        # The cache ends on Friday 2009-12-25; nothing trades before Monday
+        self.download('2009-12-26')
+        self.assertEqual(self.download('2009-12-28'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compiled Indicator Kernels
+Computes Backtrader's SMA, EMA, smoothed moving average, RSI, MACD and ATR over
+whole NumPy arrays in one compiled pass each. The arithmetic follows
+backtrader.indicators step for step (window sums are exact like math.fsum),
+so the values match Backtrader's lines; bars before an indicator's first
+value are NaN, as in Backtrader.
+"""
+
+import math
+
+import numpy as np
+
+from utils._njit import NUMBA_AVAILABLE, njit
+
+
+# Enough partial sums for any window of finite doubles
+_FSUM_PARTIALS = 128
+
+
+@njit(cache=True)
+def _fsum(values, start, stop):
+    """Correctly rounded sum of values[start:stop] (the math.fsum algorithm)"""
+    partials = np.empty(_FSUM_PARTIALS, dtype=np.float64)
+    n = 0
+    for k in range(start, stop):
+        x = values[k]
+        i = 0
+        for j in range(n):
+            y = partials[j]
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo != 0.0:
+                partials[i] = lo
+                i += 1
+            x = hi
+        n = i
+        if x != 0.0:
+            partials[n] = x
+            n += 1
+
+    # Add the partials from the largest, rounding half to even across them
+    hi = 0.0
+    lo = 0.0
+    if n > 0:
+        n -= 1
+        hi = partials[n]
+        while n > 0:
+            x = hi
+            n -= 1
+            y = partials[n]
+            hi = x + y
+            lo = y - (hi - x)
+            if lo != 0.0:
+                break
+        if n > 0 and ((lo < 0.0 and partials[n - 1] < 0.0) or
+                      (lo > 0.0 and partials[n - 1] > 0.0)):
+            y = lo * 2.0
+            x = hi + y
+            if y == x - hi:
+                hi = x
+    return hi
+
+
+# Without numba the loop above runs as Python, so use the C math.fsum instead
+if not NUMBA_AVAILABLE:
+    def _fsum(values, start, stop):
+        """Correctly rounded sum of values[start:stop]"""
+        return math.fsum(values[start:stop])
+
+
+@njit(cache=True)
+def _first_valid(values):
+    """Index of the first non-NaN value (len(values) if there is none)"""
+    for i in range(values.shape[0]):
+        if not np.isnan(values[i]):
+            return i
+    return values.shape[0]
+
+
+@njit(cache=True)
+def sma(values, period):
+    """Simple moving average, as bt.indicators.SimpleMovingAverage"""
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    first = _first_valid(values)
+    for i in range(first + period - 1, n):
+        out[i] = _fsum(values, i - period + 1, i + 1) / period
+    return out
+
+
+@njit(cache=True)
+def exp_smoothing(values, period, alpha):
+    """
+    Exponential smoothing seeded with the mean of the first period values,
+    as bt.indicators.ExponentialSmoothing
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    first = _first_valid(values)
+    seed = first + period - 1
+    if seed >= n:
+        return out
+    alpha1 = 1.0 - alpha
+    prev = _fsum(values, first, seed + 1) / period
+    out[seed] = prev
+    for i in range(seed + 1, n):
+        prev = prev * alpha1 + values[i] * alpha
+        out[i] = prev
+    return out
+
+
+@njit(cache=True)
+def ema(values, period):
+    """Exponential moving average, as bt.indicators.ExponentialMovingAverage"""
+    return exp_smoothing(values, period, 2.0 / (1.0 + period))
+
+
+@njit(cache=True)
+def smma(values, period):
+    """Smoothed (Wilder) moving average, as bt.indicators.SmoothedMovingAverage"""
+    return exp_smoothing(values, period, 1.0 / period)
+
+
+@njit(cache=True, error_model='numpy')
+def rsi(close, period):
+    """Relative strength index, as bt.indicators.RelativeStrengthIndex"""
+    n = close.shape[0]
+    upday = np.full(n, np.nan)
+    downday = np.full(n, np.nan)
+    for i in range(1, n):
+        up = close[i] - close[i - 1]
+        down = close[i - 1] - close[i]
+        upday[i] = 0.0 if 0.0 > up else up
+        downday[i] = 0.0 if 0.0 > down else down
+
+    maup = smma(upday, period)
+    madown = smma(downday, period)
+    return 100.0 - 100.0 / (1.0 + maup / madown)
+
+
+@njit(cache=True)
+def macd(close, period_me1, period_me2, period_signal):
+    """Return the MACD and signal lines, as bt.indicators.MACD"""
+    macd_line = ema(close, period_me1) - ema(close, period_me2)
+    return macd_line, ema(macd_line, period_signal)
+
+
+@njit(cache=True)
+def atr(high, low, close, period):
+    """Average true range, as bt.indicators.AverageTrueRange"""
+    n = close.shape[0]
+    true_range = np.full(n, np.nan)
+    for i in range(1, n):
+        # The true range spans the previous close as well as this bar
+        true_high = max(high[i], close[i - 1])
+        true_low = min(low[i], close[i - 1])
+        true_range[i] = true_high - true_low
+    return smma(true_range, period)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Backtest Summary Metrics
+Computes the Sharpe ratio, maximum drawdown and total return from a
+portfolio value series, and the trade counts from a position series, without
+depending on Backtrader
+"""
+
+import numpy as np
+
+
+# Trading days per year, used to annualize the Sharpe ratio
+TRADING_DAYS = 252
+
+
+def compute_metrics(portfolio_value):
+    """
+    Compute the summary metrics from the per-bar portfolio value
+    
+    Returns a dict with the annualized Sharpe ratio of the daily returns,
+    the maximum drawdown in percent and the total (log) return.
+    """
+    pv = np.asarray(portfolio_value, dtype=np.float64)
+    if len(pv) < 2:
+        return {'sharpe_ratio': 0.0, 'max_drawdown': 0.0, 'total_return': 0.0}
+    
+    # Daily returns and their annualized Sharpe ratio
+    returns = np.diff(pv) / pv[:-1]
+    std = returns.std()
+    sharpe_ratio = returns.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else 0.0
+    
+    # Largest drop from the running peak
+    max_drawdown = (1.0 - pv / np.maximum.accumulate(pv)).max() * 100
+    
+    # Log return over the whole run
+    total_return = np.log(pv[-1] / pv[0])
+    
+    return {
+        'sharpe_ratio': float(sharpe_ratio),
+        'max_drawdown': float(max_drawdown),
+        'total_return': float(total_return)
+    }
+
+
+def trade_stats(position, open_, commission):
+    """
+    Count the trades of a long-only position series filled at the open
+    
+    Every change of position is a fill at that bar's open. A trade runs from
+    the fill that opens a position to the one that closes it. As in
+    Backtrader's TradeAnalyzer, a trade still open at the end counts towards
+    the total, and a closed trade is won if its profit net of both
+    commissions is not negative. Returns a dict with total_trades and
+    won_trades.
+    """
+    position = np.asarray(position, dtype=np.int64)
+    open_ = np.asarray(open_, dtype=np.float64)
+    
+    # The size and price of every fill
+    delta = np.diff(position, prepend=0)
+    fills = np.flatnonzero(delta)
+    size = delta[fills]
+    price = open_[fills]
+    
+    # Number each fill with the trade it belongs to
+    opens = position[fills] == size
+    trade = np.cumsum(opens) - 1
+    
+    # Net profit of each trade: its cash flows less the fill commissions
+    net = np.bincount(trade, weights=-size * price - np.abs(size) * price * commission,
+                      minlength=int(opens.sum()))
+    closed = int(np.count_nonzero(position[fills] == 0))
+    
+    return {
+        'total_trades': int(opens.sum()),
+        'won_trades': int(np.count_nonzero(net[:closed] >= 0.0))
+    }
+
+
+def print_summary(metrics):
+    """Print the summary metrics and trade counts of a backtest"""
+    print(f"Sharpe Ratio: {metrics['sharpe_ratio']:.3f}")
+    print(f"Max Drawdown: {metrics['max_drawdown']:.2f}%")
+    print(f"Total Return: {metrics['total_return']:.2f}%")
+    
+    total_trades = metrics['total_trades']
+    won_trades = metrics['won_trades']
+    print(f"Total Trades: {total_trades}")
+    if total_trades > 0:
+        win_rate = (won_trades / total_trades * 100)
+        print(f"Win Rate: {win_rate:.2f}% ({won_trades}/{total_trades})")
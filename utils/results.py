@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Backtest Results Files
+Writes a results DataFrame as CSV, Parquet or Feather, chosen by the file
+extension, and maps a --format choice onto an output path
+"""
+
+import os.path
+
+
+# Output formats accepted by --format, by file extension
+RESULT_FORMATS = ('csv', 'parquet', 'feather')
+
+
+def output_path(output_file, fmt=None):
+    """
+    Return output_file with its extension replaced by the given format
+
+    Parameters:
+    - output_file: Path given with --output
+    - fmt: One of RESULT_FORMATS, or None to keep output_file as it is
+    """
+    if not fmt:
+        return output_file
+    base, ext = os.path.splitext(output_file)
+    return f"{base}.{fmt}"
+
+
+def save_results_frame(results_df, output_file):
+    """
+    Save a results DataFrame in the format given by the file extension
+
+    Parquet and Feather files are written by pyarrow straight from the
+    column buffers; anything else is written as CSV.
+    """
+    if output_file.endswith('.parquet'):
+        results_df.to_parquet(output_file, engine='pyarrow',
+                              compression='snappy', index=False)
+    elif output_file.endswith('.feather'):
+        results_df.to_feather(output_file)
+    else:
+        results_df.to_csv(output_file, index=False)
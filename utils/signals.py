@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Trading Signals
+Plain NumPy signal arrays shared by the Backtrader strategies and the compiled
+backtests, kept free of numba so Backtrader runs never import it
+"""
+
+import numpy as np
+
+
+def drop_signals(close, drop_threshold, lookback_period):
+    """
+    Return True on every bar whose close has dropped by drop_threshold or
+    more from the close lookback_period bars earlier
+    """
+    n = close.shape[0]
+    signals = np.zeros(n, dtype=np.bool_)
+    if lookback_period < n:
+        past = close[:n - lookback_period]
+        price_drop = (past - close[lookback_period:]) / past
+        signals[lookback_period:] = price_drop >= drop_threshold
+    return signals
@@ -5,22 +5,61 @@
 Visualization script for the SMA Crossover Strategy results
 """
 
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 import os
 import argparse
 
 
-def plot_equity_curve(results_file):
-    """Plot the equity curve from the results CSV file"""
-    if not os.path.exists(results_file):
+# Column names written by the CSVWriter analyzer
+RESULT_COLUMNS = {
+    'Date': 'date',
+    'Close': 'close',
+    'Position': 'position',
+    'Cash': 'cash',
+    'PortfolioValue': 'portfolio_value'
+}
+
+
+def _load_results(results_file):
+    """Load a results CSV, Parquet or Feather file indexed by date, accepting CSVWriter column names"""
+    if results_file.endswith('.parquet'):
+        df = pd.read_parquet(results_file)
+    elif results_file.endswith('.feather'):
+        df = pd.read_feather(results_file)
+    else:
+        # Arrow's multi-threaded parser reads the numeric columns straight to float64
+        df = pd.read_csv(results_file, engine='pyarrow')
+    df = df.rename(columns=RESULT_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    df.set_index('date', inplace=True)
+    return df
+
+
+def _drawdown_pct(portfolio_value):
+    """Return the drawdown from the running peak in percent, in one pass over the values"""
+    peak = np.maximum.accumulate(portfolio_value)
+    return (peak - portfolio_value) / peak * 100
+
+
+def plot_equity_curve(results_file, df=None):
+    """
+    Plot the equity curve from the results CSV file
+    
+    Parameters:
+    - results_file: Path to the results file
+    - df: Results already loaded with _load_results (read from results_file if None)
+    """
+    if df is None and not os.path.exists(results_file):
         print(f"Results file {results_file} not found.")
         return
     
+    # Imported here so printing the metrics alone never loads matplotlib
+    import matplotlib.pyplot as plt
+    
     # Load results
-    df = pd.read_csv(results_file, parse_dates=['date'])
-    df.set_index('date', inplace=True)
+    if df is None:
+        df = _load_results(results_file)
     
     # Create figure
     fig, axes = plt.subplots(3, 1, figsize=(12, 10), sharex=True, gridspec_kw={'height_ratios': [3, 1, 1]})
@@ -33,7 +72,7 @@ def plot_equity_curve(results_file):
     axes[0].legend()
     
     # Plot drawdown
-    df['drawdown'] = (df['portfolio_value'].cummax() - df['portfolio_value']) / df['portfolio_value'].cummax() * 100
+    df['drawdown'] = _drawdown_pct(df['portfolio_value'].to_numpy(dtype=np.float64))
     axes[1].fill_between(df.index, df['drawdown'], 0, color='red', alpha=0.3)
     axes[1].set_ylabel('Drawdown (%)')
     axes[1].grid(True)
@@ -55,28 +94,35 @@ def plot_equity_curve(results_file):
     plt.show()
 
 
-def calculate_performance_metrics(results_file):
-    """Calculate and print performance metrics"""
-    if not os.path.exists(results_file):
+def calculate_performance_metrics(results_file, df=None):
+    """
+    Calculate and print performance metrics
+    
+    Parameters:
+    - results_file: Path to the results file
+    - df: Results already loaded with _load_results (read from results_file if None)
+    """
+    if df is None and not os.path.exists(results_file):
         print(f"Results file {results_file} not found.")
         return
     
     # Load results
-    df = pd.read_csv(results_file, parse_dates=['date'])
-    df.set_index('date', inplace=True)
+    if df is None:
+        df = _load_results(results_file)
     
     # Calculate daily returns
-    df['daily_return'] = df['portfolio_value'].pct_change()
+    portfolio_value = df['portfolio_value'].to_numpy(dtype=np.float64)
+    daily_return = portfolio_value[1:] / portfolio_value[:-1] - 1
     
     # Calculate metrics
-    total_return = (df['portfolio_value'].iloc[-1] / df['portfolio_value'].iloc[0] - 1) * 100
+    total_return = (portfolio_value[-1] / portfolio_value[0] - 1) * 100
     annual_return = (1 + total_return/100) ** (252 / len(df)) - 1
     annual_return *= 100  # Convert to percentage
     
-    volatility = df['daily_return'].std() * np.sqrt(252) * 100
+    volatility = daily_return.std(ddof=1) * np.sqrt(252) * 100 if len(daily_return) > 1 else np.nan
     sharpe_ratio = annual_return / volatility if volatility > 0 else 0
     
-    max_drawdown = (df['portfolio_value'].cummax() - df['portfolio_value']).max() / df['portfolio_value'].cummax() * 100
+    max_drawdown = _drawdown_pct(portfolio_value).max()
     
     # Print metrics
     print("\n===== Performance Metrics =====")
@@ -88,11 +134,25 @@ def calculate_performance_metrics(results_file):
     print("===============================\n")
 
 
+def main(results_file, plot=True):
+    """Print the performance metrics and, if plot is set, plot the equity curve"""
+    if not os.path.exists(results_file):
+        print(f"Results file {results_file} not found.")
+        return
+    
+    # Load the results once for both
+    df = _load_results(results_file)
+    calculate_performance_metrics(results_file, df)
+    if plot:
+        plot_equity_curve(results_file, df)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Visualize backtest results')
     parser.add_argument('--results', type=str, default='backtest_results.csv',
-                        help='Path to the results CSV file')
+                        help='Path to the results CSV or Parquet file')
+    parser.add_argument('--no-plot', action='store_true',
+                        help='Only print the performance metrics')
     args = parser.parse_args()
     
-    calculate_performance_metrics(args.results)
-    plot_equity_curve(args.results) 
\ No newline at end of file
+    main(args.results, plot=not args.no_plot) 
\ No newline at end of file